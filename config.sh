@@ -7,6 +7,8 @@ SITE_NAME="Petnica Meteor Network"
 
 STATIC_DIR=/srv/http/$MAIN_APP/static
 MEDIA_DIR=/srv/http/$MAIN_APP/media
+GRAPH_CACHE_DIR=/tmp/$MAIN_APP/graphs
+STATION_CODE_CACHE_DIR=/tmp/$MAIN_APP/station_code
 
 SECRET_KEY_PATH=$PROJECT_DIR/$MAIN_APP/secret_key
 DB_PASS_PATH=$PROJECT_DIR/$MAIN_APP/db_password
@@ -36,6 +38,8 @@ for template in ${templates[@]}; do
             | sed "s~<site_name>~$SITE_NAME~g" \
             | sed "s~<static_dir>~$STATIC_DIR~g" \
             | sed "s~<media_dir>~$MEDIA_DIR~g" \
+            | sed "s~<graph_cache_dir>~$GRAPH_CACHE_DIR~g" \
+            | sed "s~<station_code_cache_dir>~$STATION_CODE_CACHE_DIR~g" \
             | sed "s~<socket_path>~$SOCKET_PATH~g" \
             | sed "s~<nginx_user>~$NGINX_USER~g" \
             | sed "s~<ssl_key_path>~$SSL_KEY_PATH~g" \
@@ -62,5 +66,7 @@ if [ ! -f $DB_PASS_PATH ]; then
 fi
 
 mkdir -p logs
+mkdir -p $GRAPH_CACHE_DIR
+mkdir -p $STATION_CODE_CACHE_DIR
 touch logs/system.log
 touch logs/system.log.1
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min, Max
+from datetime import timedelta
+import time
+from ...stations import rollups
+from ...stations.models import *
+
+class Command(BaseCommand):
+    help = 'Rebuild measurement rollups from the raw measurement history, one component day at a time'
+
+    def rebuild_day(self, component_id, day_start):
+        day_end = day_start + timedelta(days=1)
+        with transaction.atomic():
+            MeasurementRollup.objects.filter(component=component_id, start__gte=day_start, start__lt=day_end).delete()
+            rows = Measurement.objects.filter(
+                batch__component=component_id, batch__datetime__gte=day_start, batch__datetime__lt=day_end
+            ).values_list('key', 'num', 'unit', 'batch__datetime')
+            samples = [ (component_id, key, batch_datetime, num, unit) for key, num, unit, batch_datetime in rows ]
+            rollups.update_rollups(samples)
+        return len(samples)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        processed = 0
+        for component_id in Component.objects.order_by('id').values_list('id', flat=True):
+            bounds = MeasurementBatch.objects.filter(component=component_id).aggregate(Min('datetime'), Max('datetime'))
+            if bounds['datetime__min'] == None:
+                continue
+
+            day_start = rollups.get_bucket_start(bounds['datetime__min'], 86400)
+            while day_start <= bounds['datetime__max']:
+                processed += self.rebuild_day(component_id, day_start)
+                day_start += timedelta(days=1)
+            self.stdout.write('Component {} rebuilt, {} measurements processed ({:.0f}/s)'.format(
+                component_id, processed, processed / max(time.monotonic() - start, 0.001)
+            ))
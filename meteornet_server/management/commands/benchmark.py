@@ -0,0 +1,136 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+import time
+import math
+import random
+import uuid
+import json
+from urllib.parse import urlencode, parse_qs
+from ...stations import stations, series, synthetic, wire
+from ...stations.models import *
+from ... import views
+
+class Command(BaseCommand):
+    help = 'Measure query count and wall time of hot paths against synthetic data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=['component_data', 'series', 'wire', 'stations_overview'])
+        parser.add_argument('--components', type=int, default=2)
+        parser.add_argument('--keys', type=int, default=40)
+        parser.add_argument('--days', type=int, default=stations.RECENT_MEASUREMENTS_DAYS)
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between synthetic batches')
+        parser.add_argument('--points', type=int, default=100000, help='Points per synthetic series')
+        parser.add_argument('--repeat', type=int, default=1000, help='Decodes per wire format')
+        parser.add_argument('--stations', type=int, default=50, help='Smallest synthetic fleet, grown tenfold twice')
+
+    def measure(self, name, function, *args):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function(*args)
+            elapsed = time.perf_counter() - start
+        self.stdout.write('{}: {} queries, {:.3f} s'.format(name, len(queries.captured_queries), elapsed))
+        return result
+
+    def component_data(self, options):
+        station = synthetic.seed_station(options['components'], options['keys'], options['days'], options['interval'])
+        self.stdout.write('Seeded {} batches with {} measurements each'.format(
+            MeasurementBatch.objects.filter(component__station=station.id).count(), options['keys']
+        ))
+        component_ids = list(Component.objects.filter(station=station.id).values_list('id', flat=True))
+        since = timezone.now() - timedelta(days=stations.RECENT_MEASUREMENTS_DAYS)
+        self.measure('load_component_batches', lambda: list(stations.load_component_batches(component_ids, since)))
+        self.measure('get_component_data', stations.get_component_data, station)
+
+    def series(self, options):
+        start = timezone.now() - timedelta(days=stations.RECENT_MEASUREMENTS_DAYS)
+        datetimes = [ start + timedelta(seconds=(i + i // 1000 * 5) * options['interval']) for i in range(options['points']) ]
+        values = {
+            'numeric' : [ '{:.2f}V'.format(1 + math.sin(i / 100)) for i in range(len(datetimes)) ],
+            'categorical' : [ random.choice(['OK', 'WARNING', 'ERROR']) for i in range(len(datetimes)) ],
+        }
+        for name in values:
+            points = [ (x, value) + series.parse_value(value) for x, value in zip(datetimes, values[name]) ]
+            median_interval = self.measure(name + ' get_median_interval', series.get_median_interval, datetimes)
+            data = self.measure(name + ' build_series', series.build_series, points, median_interval)
+            self.measure(name + ' downsample', series.downsample, data, stations.SERIES_DEFAULT_POINTS)
+
+    def get_wire_payload(self, options):
+        timestamp = int(time.time())
+        return {
+            'security_token' : '0123456789abcdef0123456789abcdef',
+            'timestamp' : timestamp,
+            'name' : 'Synthetic station',
+            'components' : [ {
+                'name' : 'Component {}'.format(c),
+                'measurements' : { 'Key {}'.format(k) : '{:.2f}V'.format(k + math.sin(timestamp + c)) for k in range(options['keys']) },
+            } for c in range(options['components']) ],
+            'maintainers' : [ { 'name' : 'Maintainer', 'phone' : '0600000000', 'email' : 'maintainer@example.com' } ],
+        }
+
+    def measure_decode(self, name, body, decode, repeat):
+        start = time.perf_counter()
+        for i in range(repeat):
+            error = wire.validate_reading(decode(body))
+        elapsed = time.perf_counter() - start
+        if error != None:
+            self.stdout.write('{}: invalid payload ({})'.format(name, error))
+        self.stdout.write('{:<28} {:>8} bytes, {:>8.1f} us per payload'.format(name, len(body), elapsed / repeat * 1e6))
+
+    def wire(self, options):
+        payload = self.get_wire_payload(options)
+        form_body = urlencode({ 'json' : json.dumps(payload) }).encode('utf-8')
+        self.measure_decode('form json', form_body, lambda body: json.loads(parse_qs(body.decode('utf-8'))['json'][0]), options['repeat'])
+
+        content_types = [ wire.JSON_CONTENT_TYPE ]
+        if wire.msgpack != None: content_types.append(wire.MSGPACK_CONTENT_TYPES[0])
+        if wire.cbor2 != None: content_types.append(wire.CBOR_CONTENT_TYPE)
+        for content_type in content_types:
+            for content_encoding in wire.DECOMPRESSORS:
+                if content_encoding == 'x-gzip': continue
+                body = wire.encode_body(payload, content_type, content_encoding)
+                self.measure_decode(
+                    '{} {}'.format(content_type.split('/')[1], content_encoding), body,
+                    lambda body: wire.decode_body(body, content_type, content_encoding), options['repeat']
+                )
+
+    def get_overview_queries(self, request):
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            views.stations_overview(request)
+            elapsed = time.perf_counter() - start
+        return len(queries.captured_queries), elapsed
+
+    def stations_overview(self, options):
+        user = User.objects.create_user('benchmark-' + uuid.uuid4().hex[:8])
+        request_factory = RequestFactory()
+        stations.get_statuses()
+        query_counts = set()
+        for fleet_size in [ options['stations'], options['stations'] * 10, options['stations'] * 100 ]:
+            Station.objects.bulk_create([
+                Station(security_token=uuid.uuid4().hex, name='Station {}'.format(i), approved=True,
+                        last_updated=timezone.now() - timedelta(minutes=random.randint(0, 10000)))
+                for i in range(fleet_size - Station.objects.filter(approved=True).count())
+            ])
+            for sort in stations.OVERVIEW_SORTS:
+                page, next_cursor = stations.get_overview_page(sort)
+                for cursor in [ None, next_cursor ]:
+                    request = request_factory.get('/stations_overview', { 'sort' : sort } if cursor == None else { 'sort' : sort, 'after' : cursor })
+                    request.user = user
+                    query_count, elapsed = self.get_overview_queries(request)
+                    self.stdout.write('{} stations, sort by {}, {} page: {} queries, {:.3f} s'.format(
+                        fleet_size, sort, 'first' if cursor == None else 'second', query_count, elapsed
+                    ))
+                    query_counts.add(query_count)
+        if len(query_counts) > 1:
+            raise CommandError('stations_overview query count depends on the fleet size: {}'.format(sorted(query_counts)))
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            getattr(self, options['target'])(options)
+            transaction.set_rollback(True)
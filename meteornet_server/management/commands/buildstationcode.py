@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ...stations import code_distribution
+
+class Command(BaseCommand):
+    help = 'Hash station_code.zip, cache it for X-Accel-Redirect and build delta archives from previous versions'
+
+    def progress(self, previous_manifest, changed_files, deleted_files):
+        self.stdout.write('Delta from {} ({}): {} changed, {} deleted files'.format(
+            previous_manifest['version'], previous_manifest['hash'][:12], len(changed_files), len(deleted_files)
+        ))
+
+    def handle(self, *args, **options):
+        manifest = code_distribution.build(progress=self.progress)
+        self.stdout.write('Station code {} ({}), {} files, {} bytes'.format(
+            manifest['version'], manifest['hash'][:12], len(manifest['files']), manifest['size']
+        ))
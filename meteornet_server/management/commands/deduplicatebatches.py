@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from ...stations import retention
+
+class Command(BaseCommand):
+    help = 'Delete measurement batches that repeat an earlier batch of the same component and timestamp, in committed chunks (safe to interrupt and rerun)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=retention.DEDUPLICATION_CHUNK_SIZE, help='Batches scanned per chunk')
+
+    def progress(self, last_id, deleted_batches, deleted_measurements, elapsed):
+        self.stdout.write('Scanned up to batch {}: {} batches, {} measurements deleted ({:.1f} s)'.format(
+            last_id, deleted_batches, deleted_measurements, elapsed
+        ))
+
+    def handle(self, *args, **options):
+        deleted_batches, deleted_measurements = retention.delete_duplicate_batches(options['chunk_size'], progress=self.progress)
+        if deleted_batches > 0:
+            self.stdout.write('Rollups still count the deleted duplicates, run backfillrollups to rebuild them')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from ...stations import stations, retention, rollups
+
+class Command(BaseCommand):
+    help = 'Delete measurements older than the retention period in committed chunks (safe to interrupt and rerun)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=stations.OLD_DATA_DAYS)
+        parser.add_argument('--chunk-size', type=int, default=retention.RETENTION_CHUNK_SIZE, help='Batches per chunk')
+
+    def progress(self, deleted_batches, deleted_measurements, elapsed):
+        self.stdout.write('{} batches, {} measurements deleted ({:.0f} rows/s)'.format(
+            deleted_batches, deleted_measurements, (deleted_batches + deleted_measurements) / max(elapsed, 0.001)
+        ))
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        retention.delete_old_batches(cutoff, options['chunk_size'], progress=self.progress)
+        self.stdout.write('{} orphaned persons deleted'.format(retention.delete_orphan_persons()))
+        self.stdout.write('{} expired rollups deleted'.format(rollups.delete_old_rollups()))
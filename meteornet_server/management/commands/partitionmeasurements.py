@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import timedelta
+from ...stations import stations, partitions
+
+class Command(BaseCommand):
+    help = 'Manage monthly PostgreSQL partitions of measurement batches and measurements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'convert', 'create', 'drop'])
+        parser.add_argument('--months', type=int, default=partitions.PARTITION_MONTHS_AHEAD, help='Months to create ahead')
+        parser.add_argument('--days', type=int, default=stations.OLD_DATA_DAYS, help='Drop partitions entirely older than this')
+        parser.add_argument('--detach', action='store_true', help='Detach old partitions instead of dropping them')
+        parser.add_argument('--offline', action='store_true',
+            help='Confirm that ingest and the web app are stopped, required by convert')
+
+    def progress(self, table, month_start, moved_count):
+        self.stdout.write('{} {:%Y-%m}: {} rows moved'.format(table, month_start, moved_count))
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            raise CommandError('Partitioning requires PostgreSQL 11 or newer')
+        partitioned = partitions.is_partitioned()
+
+        if options['action'] == 'status':
+            self.stdout.write('Partitioned: {}'.format(partitioned))
+            for model in partitions.PARTITIONED_MODELS:
+                for month_start, name in sorted(partitions.get_partitions(model).items()):
+                    self.stdout.write(name)
+        elif options['action'] == 'convert':
+            if partitioned:
+                raise CommandError('Tables are already partitioned')
+            if not options['offline']:
+                raise CommandError(
+                    'convert moves rows month by month in separate transactions, so readers see partially '
+                    'moved history while it runs. Stop ingest, runperiodic and the web app, then rerun with --offline'
+                )
+            self.stdout.write(
+                'Dropping the measurement to batch foreign key, partitioned tables cannot keep it. '
+                'Measurements are no longer checked against their batch, retention deletes them explicitly. '
+                'The primary keys become (id, datetime), unique, check and outgoing foreign key constraints such as '
+                'batch to component are recreated on the partitioned tables'
+            )
+            partitions.convert(self.progress)
+        elif not partitioned:
+            raise CommandError('Tables are not partitioned, run convert first')
+        elif options['action'] == 'create':
+            for name in partitions.create_partitions_ahead(options['months']):
+                self.stdout.write('Created ' + name)
+        elif options['action'] == 'drop':
+            cutoff = timezone.now() - timedelta(days=options['days'])
+            for name in partitions.drop_old_partitions(cutoff, options['detach']):
+                self.stdout.write(('Detached ' if options['detach'] else 'Dropped ') + name)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import time
+from ...stations import latest_values
+from ...stations.models import *
+
+class Command(BaseCommand):
+    help = 'Rebuild the latest value table from the raw measurement history, one component at a time'
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        rebuilt = 0
+        for component_id in Component.objects.order_by('id').values_list('id', flat=True):
+            with transaction.atomic():
+                rebuilt += latest_values.rebuild_latest_values(component_id)
+            self.stdout.write('Component {} rebuilt, {} latest values ({:.0f}/s)'.format(
+                component_id, rebuilt, rebuilt / max(time.monotonic() - start, 0.001)
+            ))
@@ -1,33 +1,48 @@
 from django.core.management.base import BaseCommand, CommandError
 import threading
 import signal
-from ...stations import stations
+from ...stations import stations, rendering, scheduler, status_queue
 
 class Command(BaseCommand):
     help = 'Keep periodic operations running'
 
     def update_statuses(self):
+        status_scheduler = scheduler.StatusScheduler()
         with self.lock:
             while True:
-                stations.update_statuses()
+                status_scheduler.run_due()
                 if self.done: break
-                self.condition.wait(timeout=900)
+                self.condition.wait(timeout=status_scheduler.get_timeout())
 
     def delete_old_data(self):
-        with self.lock:
-            while True:
-                self.condition.wait(timeout=86400)
-                if self.done: break
-                stations.delete_old_data()
+        while not self.stopped.wait(timeout=86400):
+            stations.delete_old_data(self.stopped)
+
+    def render_graphs(self):
+        renderer = rendering.GraphRenderer()
+        while not self.stopped.wait(timeout=rendering.GRAPH_POLL_SECONDS):
+            while renderer.poll() > 0:
+                if self.stopped.is_set(): break
+        renderer.shutdown()
+
+    def process_dirty_stations(self):
+        while not self.stopped.wait(timeout=status_queue.STATUS_QUEUE_POLL_SECONDS):
+            while stations.process_dirty_stations() > 0:
+                if self.stopped.is_set(): break
 
     def handle(self, *args, **options):
         self.done = False
         self.lock = threading.Lock()
         self.condition = threading.Condition(self.lock)
+        self.stopped = threading.Event()
         update_statuses_thread = threading.Thread(target=Command.update_statuses, args=(self,))
         update_statuses_thread.start()
         delete_old_data_thread = threading.Thread(target=Command.delete_old_data, args=(self,))
         delete_old_data_thread.start()
+        render_graphs_thread = threading.Thread(target=Command.render_graphs, args=(self,))
+        render_graphs_thread.start()
+        process_dirty_stations_thread = threading.Thread(target=Command.process_dirty_stations, args=(self,))
+        process_dirty_stations_thread.start()
 
         try:
             signal.signal(signal.SIGINT, lambda *args: None)
@@ -38,5 +53,8 @@ class Command(BaseCommand):
         with self.lock:
             self.done = True
             self.condition.notify_all()
+        self.stopped.set()
         update_statuses_thread.join()
         delete_old_data_thread.join()
+        render_graphs_thread.join()
+        process_dirty_stations_thread.join()
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+def normalize_person(name, phone, email):
+    name = ' '.join(str(name).split())
+    phone = ''.join(str(phone).split())
+    email = str(email).strip().lower()
+    return name, phone, email
+
+
+def merge_duplicate_persons(apps, schema_editor):
+    Person = apps.get_model('meteornet_server', 'Person')
+    Station = apps.get_model('meteornet_server', 'Station')
+
+    persons = {}
+    for person in Person.objects.order_by('id'):
+        key = normalize_person(person.name, person.phone, person.email)
+        if key in persons:
+            keeper = persons[key]
+            for station in Station.objects.filter(maintainers=person):
+                station.maintainers.add(keeper)
+            person.delete()
+        else:
+            persons[key] = person
+            person.name, person.phone, person.email = key
+            person.save()
+
+    if schema_editor.connection.vendor == 'postgresql':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0005_auto_20191223_0221'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='maintainers_fingerprint',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RunPython(merge_duplicate_persons, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='person',
+            constraint=models.UniqueConstraint(fields=('name', 'phone', 'email'), name='unique_person'),
+        ),
+    ]
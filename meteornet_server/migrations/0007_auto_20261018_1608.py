@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0006_auto_20261018_1601'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='', max_length=128)),
+                ('resolution', models.IntegerField(default=60)),
+                ('start', models.DateTimeField(default=django.utils.timezone.now)),
+                ('count', models.IntegerField(default=0)),
+                ('minimum', models.FloatField(default=0.0)),
+                ('maximum', models.FloatField(default=0.0)),
+                ('total', models.FloatField(default=0.0)),
+                ('last', models.FloatField(default=0.0)),
+                ('last_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unit', models.CharField(default='', max_length=128)),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meteornet_server.Component')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='measurementrollup',
+            constraint=models.UniqueConstraint(fields=('component', 'key', 'resolution', 'start'), name='unique_measurement_rollup'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:09
+
+from django.db import migrations, models, transaction
+import re
+
+CHUNK_SIZE = 10000
+NUMBER_PREFIX_REGEX = re.compile(r'\d+(?:\.\d*)?\s*')
+
+
+def parse_value(value):
+    value = str(value)
+    match = NUMBER_PREFIX_REGEX.match(value)
+    if match == None:
+        return None, ''
+    return float(match.group()), value[match.end():]
+
+
+def parse_measurement_values(apps, schema_editor):
+    Measurement = apps.get_model('meteornet_server', 'Measurement')
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            measurements = list(Measurement.objects.filter(id__gt=last_id).order_by('id').only('id', 'value')[:CHUNK_SIZE])
+            if len(measurements) == 0:
+                break
+
+            parsed_measurements = []
+            for measurement in measurements:
+                measurement.num, measurement.unit = parse_value(measurement.value)
+                if measurement.num != None:
+                    parsed_measurements.append(measurement)
+            Measurement.objects.bulk_update(parsed_measurements, ['num', 'unit'], batch_size=1000)
+        last_id = measurements[-1].id
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('meteornet_server', '0007_auto_20261018_1608'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='num',
+            field=models.FloatField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='measurement',
+            name='unit',
+            field=models.CharField(default='', max_length=128),
+        ),
+        migrations.RunPython(parse_measurement_values, migrations.RunPython.noop),
+    ]
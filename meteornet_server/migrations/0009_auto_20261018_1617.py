@@ -0,0 +1,54 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:17
+
+from django.db import migrations, models
+from datetime import timedelta
+import django.db.models.deletion
+import django.utils.timezone
+
+CHUNK_SIZE = 10000
+RECENT_DAYS = 7
+
+
+def fill_latest_values(apps, schema_editor):
+    Measurement = apps.get_model('meteornet_server', 'Measurement')
+    LatestValue = apps.get_model('meteornet_server', 'LatestValue')
+
+    newest_samples = {}
+    rows = Measurement.objects.filter(
+        batch__datetime__gt=django.utils.timezone.now() - timedelta(days=RECENT_DAYS)
+    ).values_list('batch__component', 'key', 'batch__datetime', 'value', 'num', 'unit').iterator(chunk_size=CHUNK_SIZE)
+    for component_id, key, sample_datetime, value, num, unit in rows:
+        if not (component_id, key) in newest_samples or sample_datetime >= newest_samples[(component_id, key)][0]:
+            newest_samples[(component_id, key)] = (sample_datetime, value, num, unit)
+
+    LatestValue.objects.bulk_create([
+        LatestValue(component_id=component_id, key=key, datetime=sample[0], value=sample[1], num=sample[2], unit=sample[3])
+        for (component_id, key), sample in newest_samples.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0008_auto_20261018_1609'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestValue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default='', max_length=128)),
+                ('value', models.CharField(default='', max_length=128)),
+                ('num', models.FloatField(default=None, null=True)),
+                ('unit', models.CharField(default='', max_length=128)),
+                ('datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meteornet_server.Component')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='latestvalue',
+            constraint=models.UniqueConstraint(fields=('component', 'key'), name='unique_latest_value'),
+        ),
+        migrations.RunPython(fill_latest_values, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0009_auto_20261018_1617'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyStation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked', models.DateTimeField(default=django.utils.timezone.now)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meteornet_server.Station')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dirtystation',
+            constraint=models.UniqueConstraint(fields=('station',), name='unique_dirty_station'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0010_auto_20261018_1622'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='measurementbatch',
+            name='datetime',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:24
+
+from django.db import migrations, models, transaction
+from django.db.models import Max
+import django.utils.timezone
+
+CHUNK_SIZE = 50000
+
+
+def copy_batch_datetimes(apps, schema_editor):
+    Measurement = apps.get_model('meteornet_server', 'Measurement')
+    MeasurementBatch = apps.get_model('meteornet_server', 'MeasurementBatch')
+    quote_name = schema_editor.connection.ops.quote_name
+
+    sql = 'UPDATE {measurement} SET datetime = (SELECT datetime FROM {batch} WHERE {batch}.id = {measurement}.batch_id) WHERE id > %s AND id <= %s'.format(
+        measurement=quote_name(Measurement._meta.db_table),
+        batch=quote_name(MeasurementBatch._meta.db_table),
+    )
+    last_id = Measurement.objects.aggregate(Max('id'))['id__max'] or 0
+    for start in range(0, last_id, CHUNK_SIZE):
+        with transaction.atomic():
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute(sql, [start, start + CHUNK_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('meteornet_server', '0011_auto_20261018_1623'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurement',
+            name='datetime',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_batch_datetimes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0012_measurement_datetime'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='station',
+            name='security_token',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='measurementbatch',
+            index=models.Index(fields=['component', 'datetime'], name='batch_component_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['approved'], name='station_approved_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_batches(apps, schema_editor):
+    MeasurementBatch = apps.get_model('meteornet_server', 'MeasurementBatch')
+    if MeasurementBatch.objects.values('component', 'datetime').annotate(count=Count('id')).filter(count__gt=1).exists():
+        raise RuntimeError(
+            'Measurement batches repeat the same component and timestamp, '
+            'run ./manage.py deduplicatebatches first and then migrate again'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0013_auto_20261018_1626'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_batches, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='measurementbatch',
+            constraint=models.UniqueConstraint(fields=('component', 'datetime'), name='unique_component_batch'),
+        ),
+        migrations.RemoveIndex(
+            model_name='measurementbatch',
+            name='batch_component_datetime_idx',
+        ),
+    ]
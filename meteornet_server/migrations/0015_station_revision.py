@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0014_auto_20261018_1637'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='revision',
+            field=models.IntegerField(default=0),
+        ),
+    ]
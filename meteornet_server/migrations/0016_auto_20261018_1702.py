@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0015_station_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyComponent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marked', models.DateTimeField(default=django.utils.timezone.now)),
+                ('uploads', models.IntegerField(default=1)),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meteornet_server.Component')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dirtycomponent',
+            constraint=models.UniqueConstraint(fields=('component',), name='unique_dirty_component'),
+        ),
+    ]
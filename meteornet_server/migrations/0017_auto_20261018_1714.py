@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0016_auto_20261018_1702'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dirtycomponent',
+            index=models.Index(fields=['marked'], name='dirty_component_marked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dirtystation',
+            index=models.Index(fields=['marked'], name='dirty_station_marked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['-last_updated', '-id'], name='station_last_updated_idx'),
+        ),
+    ]
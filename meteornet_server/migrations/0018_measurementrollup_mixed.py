@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meteornet_server', '0017_auto_20261018_1714'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurementrollup',
+            name='mixed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
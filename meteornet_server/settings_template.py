@@ -117,6 +117,28 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = '<static_dir>'
 
+GRAPH_CACHE_DIR = '<graph_cache_dir>'
+
+STATION_CODE_CACHE_DIR = '<station_code_cache_dir>'
+
+# Station token cache shared between uWSGI workers (cache2 name in uwsgi.ini)
+STATION_TOKEN_UWSGI_CACHE = 'station_tokens'
+
+# Rendered station page fragments, keyed on the station revision
+# File based: 'django.core.cache.backends.filebased.FileBasedCache' with 'LOCATION' : '/tmp/meteornet_server/fragments'
+# Redis: 'django_redis.cache.RedisCache' with 'LOCATION' : 'redis://127.0.0.1:6379/1'
+CACHES = {
+    'default' : {
+        'BACKEND' : 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'station_fragments' : {
+        'BACKEND' : 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION' : 'station_fragments',
+        'OPTIONS' : { 'MAX_ENTRIES' : 10000 },
+    },
+}
+STATION_FRAGMENT_CACHE = 'station_fragments'
+
 # Misc
 LOGIN_URL = '/'
 
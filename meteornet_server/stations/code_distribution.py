@@ -0,0 +1,201 @@
+from django.conf import settings
+
+from os import path
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import zipfile
+
+CODE_ACCEL_REDIRECT_PREFIX = '/station_code_cache/'
+CODE_HISTORY_VERSIONS = 10
+CODE_HASH_REGEX = re.compile('^[0-9a-f]{64}$')
+VERSION_REGEX = re.compile('^VERSION\\s*=\\s*[\'"]([^\'"]*)[\'"]', re.MULTILINE)
+VERSION_FILENAME = 'station_code/internals/config.py'
+MANIFEST_FILENAME = 'manifest.json'
+
+loaded_manifest = {}
+
+def get_cache_dir():
+    return settings.STATION_CODE_CACHE_DIR
+
+def get_code_filepath():
+    return path.join(path.dirname(__file__), 'station_code.zip')
+
+def get_archive_name(code_hash):
+    return code_hash + '.zip'
+
+def get_manifest_name(code_hash):
+    return code_hash + '.json'
+
+def get_delta_name(from_hash, to_hash):
+    return '{}-{}.zip'.format(from_hash, to_hash)
+
+def get_cache_path(name):
+    return path.join(get_cache_dir(), name)
+
+def get_file_hash(filepath):
+    file_hash = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def write_atomic(name, write):
+    descriptor, temp_path = tempfile.mkstemp(dir=get_cache_dir())
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            write(f)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, get_cache_path(name))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def write_manifest(name, manifest):
+    write_atomic(name, lambda f: f.write(json.dumps(manifest, sort_keys=True).encode()))
+
+def read_manifest(name):
+    try:
+        with open(get_cache_path(name), 'rb') as f:
+            return json.loads(f.read().decode())
+    except (OSError, ValueError):
+        return None
+
+def make_manifest(code_filepath):
+    code_hash = get_file_hash(code_filepath)
+    files = {}
+    version = ''
+    with zipfile.ZipFile(code_filepath) as archive:
+        for info in archive.infolist():
+            if info.filename.endswith('/'):
+                continue
+            data = archive.read(info)
+            files[info.filename] = hashlib.sha256(data).hexdigest()
+            if info.filename == VERSION_FILENAME:
+                match = VERSION_REGEX.search(data.decode('utf-8', 'replace'))
+                if match != None:
+                    version = match.group(1)
+    return {
+        'version' : version,
+        'hash' : code_hash,
+        'size' : path.getsize(code_filepath),
+        'files' : files,
+    }
+
+def get_changed_files(from_manifest, to_manifest):
+    return sorted([ name for name, file_hash in to_manifest['files'].items() if from_manifest['files'].get(name) != file_hash ])
+
+def write_delta(from_manifest, to_manifest, code_filepath):
+    changed_files = get_changed_files(from_manifest, to_manifest)
+    deleted_files = sorted([ name for name in from_manifest['files'] if not name in to_manifest['files'] ])
+
+    def write(f):
+        with zipfile.ZipFile(code_filepath) as source, zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as delta:
+            for name in changed_files:
+                delta.writestr(source.getinfo(name), source.read(name))
+            delta.writestr(MANIFEST_FILENAME, json.dumps({
+                'from' : from_manifest['hash'],
+                'to' : to_manifest['hash'],
+                'version' : to_manifest['version'],
+                'changed' : changed_files,
+                'deleted' : deleted_files,
+            }, sort_keys=True))
+    write_atomic(get_delta_name(from_manifest['hash'], to_manifest['hash']), write)
+    return changed_files, deleted_files
+
+def get_previous_manifests(current_hash):
+    manifests = []
+    for name in os.listdir(get_cache_dir()):
+        if name.endswith('.json') and CODE_HASH_REGEX.match(name[:-len('.json')]) and name[:-len('.json')] != current_hash:
+            manifests.append((os.stat(get_cache_path(name)).st_mtime, name))
+    return [ name for mtime, name in sorted(manifests, reverse=True) ]
+
+def remove_unused(manifest, kept_hashes):
+    for name in os.listdir(get_cache_dir()):
+        if name == MANIFEST_FILENAME:
+            continue
+        if name.endswith('.json') and name[:-len('.json')] in kept_hashes:
+            continue
+        if name == get_archive_name(manifest['hash']):
+            continue
+        if name.endswith('.zip') and name[:-len('.zip')].split('-')[-1] == manifest['hash'] and name.split('-')[0] in kept_hashes:
+            continue
+        if name.endswith('.json') or name.endswith('.zip'):
+            os.unlink(get_cache_path(name))
+
+def build(code_filepath=None, progress=None):
+    code_filepath = code_filepath or get_code_filepath()
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    manifest = make_manifest(code_filepath)
+
+    previous_names = get_previous_manifests(manifest['hash'])[:CODE_HISTORY_VERSIONS]
+    kept_hashes = set([ manifest['hash'] ])
+    for name in previous_names:
+        previous_manifest = read_manifest(name)
+        if previous_manifest == None:
+            continue
+        kept_hashes.add(previous_manifest['hash'])
+        if not path.isfile(get_cache_path(get_delta_name(previous_manifest['hash'], manifest['hash']))):
+            changed_files, deleted_files = write_delta(previous_manifest, manifest, code_filepath)
+            if progress != None:
+                progress(previous_manifest, changed_files, deleted_files)
+
+    if not path.isfile(get_cache_path(get_archive_name(manifest['hash']))):
+        with open(code_filepath, 'rb') as source:
+            write_atomic(get_archive_name(manifest['hash']), lambda f: shutil.copyfileobj(source, f))
+    write_manifest(get_manifest_name(manifest['hash']), manifest)
+    write_manifest(MANIFEST_FILENAME, manifest)
+    remove_unused(manifest, kept_hashes)
+    loaded_manifest.clear()
+    return manifest
+
+def get_manifest():
+    manifest_path = get_cache_path(MANIFEST_FILENAME)
+    try:
+        mtime = os.stat(manifest_path).st_mtime
+        code_mtime = os.stat(get_code_filepath()).st_mtime
+    except OSError:
+        mtime = None
+        code_mtime = None
+
+    if mtime == None or code_mtime > mtime:
+        loaded_manifest['manifest'] = build()
+        loaded_manifest['mtime'] = os.stat(manifest_path).st_mtime
+    elif loaded_manifest.get('mtime') != mtime:
+        manifest = read_manifest(MANIFEST_FILENAME)
+        if manifest == None:
+            manifest = build()
+        loaded_manifest['manifest'] = manifest
+        loaded_manifest['mtime'] = mtime
+    return loaded_manifest['manifest']
+
+def get_version():
+    return get_manifest()['version']
+
+def get_etag():
+    return get_manifest()['hash']
+
+def get_delta(from_hash):
+    if CODE_HASH_REGEX.match(from_hash or '') == None:
+        return None
+    name = get_delta_name(from_hash, get_etag())
+    if not path.isfile(get_cache_path(name)):
+        return None
+    return name
+
+def parse_range(range_header, size):
+    match = re.match('^bytes=(\\d*)-(\\d*)$', (range_header or '').strip())
+    if match == None or (match.group(1) == '' and match.group(2) == ''):
+        return None
+    if match.group(1) == '':
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    else:
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) != '' else size - 1
+    if start > end:
+        return False
+    return start, end
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db.models import F
+
+from .models import *
+
+FRAGMENT_CACHE_SECONDS = 600
+
+def get_cache_alias():
+    return getattr(settings, 'STATION_FRAGMENT_CACHE', 'default')
+
+def get_revision_update():
+    return F('revision') + 1
+
+def bump(station_ids=None):
+    station_objects = Station.objects.all()
+    if station_ids != None:
+        station_objects = station_objects.filter(id__in=station_ids)
+    station_objects.update(revision=get_revision_update())
@@ -0,0 +1,44 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import *
+
+GRAPH_QUEUE_BATCH_SIZE = 500
+
+def mark_dirty_on_conflict(component_ids):
+    table = connection.ops.quote_name(DirtyComponent._meta.db_table)
+    component = connection.ops.quote_name(DirtyComponent._meta.get_field('component').column)
+    uploads = connection.ops.quote_name(DirtyComponent._meta.get_field('uploads').column)
+    params = []
+    for component_id in component_ids:
+        params += [ component_id, timezone.now() ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({component}, {marked}, {uploads}) VALUES {values} '
+            'ON CONFLICT ({component}) DO UPDATE SET {uploads} = {table}.{uploads} + 1'.format(
+                table=table,
+                component=component,
+                marked=connection.ops.quote_name(DirtyComponent._meta.get_field('marked').column),
+                uploads=uploads,
+                values=', '.join(['(%s, %s, 1)'] * len(component_ids))
+            ), params)
+
+def mark_dirty(component_ids):
+    component_ids = sorted(set(component_ids))
+    if len(component_ids) == 0:
+        return
+    if connection.vendor == 'postgresql':
+        mark_dirty_on_conflict(component_ids)
+    else:
+        DirtyComponent.objects.bulk_create([ DirtyComponent(component_id=component_id) for component_id in component_ids ], ignore_conflicts=True)
+
+def take_dirty_components():
+    with transaction.atomic():
+        dirty = list(DirtyComponent.objects.select_for_update(skip_locked=True).order_by('marked').values_list(
+            'id', 'component', 'uploads'
+        )[:GRAPH_QUEUE_BATCH_SIZE])
+        if len(dirty) == 0:
+            return []
+        DirtyComponent.objects.filter(id__in=[ row[0] for row in dirty ]).delete()
+    station_ids = dict(Component.objects.filter(id__in=[ row[1] for row in dirty ]).values_list('id', 'station'))
+    return [ (component_id, station_ids[component_id], uploads) for _, component_id, uploads in dirty if component_id in station_ids ]
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.utils import timezone
+
+from datetime import datetime
+from os import path
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import matplotlib
+matplotlib.use('WebAgg')
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mticker
+from pandas.plotting import register_matplotlib_converters
+register_matplotlib_converters()
+import seaborn as sns
+sns.set()
+
+GRAPH_STYLE = 1
+GRAPH_CACHE_MAX_FILES = 4096
+GRAPH_ACCEL_REDIRECT_PREFIX = '/graph_cache/'
+GRAPH_WINDOW_STEP_SECONDS = 3600
+GRAPH_NAME_REGEX = re.compile(r'^[0-9a-f]{64}\.png$')
+
+def get_cache_dir():
+    return settings.GRAPH_CACHE_DIR
+
+def get_window_start(moment):
+    timestamp = int(moment.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % GRAPH_WINDOW_STEP_SECONDS, timezone.utc)
+
+def get_graph_name(station_id, component_name, key, last_batch_id, window_start):
+    graph_key = json.dumps([ station_id, component_name, key, last_batch_id, int(window_start.timestamp()), GRAPH_STYLE ])
+    return hashlib.sha256(graph_key.encode()).hexdigest() + '.png'
+
+def get_latest_graph_name(station_id, component_name, key):
+    latest_key = json.dumps([ station_id, component_name, key, GRAPH_STYLE ])
+    return hashlib.sha256(latest_key.encode()).hexdigest() + '.latest'
+
+def get_latest_graph(latest_graph):
+    try:
+        with open(path.join(get_cache_dir(), latest_graph)) as latest_file:
+            graph = latest_file.read().strip()
+    except OSError:
+        return None
+    return graph if graph_exists(graph) else None
+
+def set_latest_graph(latest_graph, graph):
+    fd, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=get_cache_dir())
+    try:
+        with os.fdopen(fd, 'w') as temporary_file:
+            temporary_file.write(graph)
+        os.replace(temporary_path, path.join(get_cache_dir(), latest_graph))
+    except Exception:
+        os.remove(temporary_path)
+        raise
+
+def get_graph_path(graph):
+    if GRAPH_NAME_REGEX.match(graph) == None:
+        return None
+    return path.join(get_cache_dir(), graph)
+
+def graph_exists(graph):
+    graph_path = get_graph_path(graph)
+    return graph_path != None and path.isfile(graph_path)
+
+def get_graph_etag(graph):
+    if not graph_exists(graph):
+        return None
+    return graph[:-len('.png')]
+
+def get_graph_last_modified(graph):
+    if not graph_exists(graph):
+        return None
+    return datetime.fromtimestamp(os.stat(get_graph_path(graph)).st_mtime, timezone.utc)
+
+def touch_graph(graph):
+    graph_path = get_graph_path(graph)
+    try:
+        os.utime(graph_path, (time.time(), os.stat(graph_path).st_mtime))
+    except OSError:
+        pass
+
+def get_graph_color(component_name, key):
+    digest = hashlib.sha256((component_name + '/' + key).encode()).digest()
+    return [ digest[0] / 255, digest[1] / 255, digest[2] / 255 ]
+
+def render_graph(graph, latest_graph, title, data, color):
+    os.makedirs(get_cache_dir(), exist_ok=True)
+
+    plt.figure(figsize=(12, 5))
+    if 'classes' in data:
+        plt.yticks(data['class_ids'], data['classes'], size='x-large')
+    else:
+        ax = plt.gca()
+        ax.yaxis.set_major_formatter(mticker.ScalarFormatter())
+        ax.yaxis.get_major_formatter().set_useOffset(False)
+    if 'unit' in data: plt.ylabel(data['unit'], rotation='horizontal', size='x-large', labelpad=25)
+    plt.title(title, size='xx-large')
+    plt.tick_params(axis='x', which='major', labelsize='large')
+    plt.tick_params(axis='y', which='major', labelsize='x-large')
+    for start, end in data['segments']:
+        plt.plot(data['x'][start:end], data['y'][start:end], color=color)
+
+    fd, temporary_path = tempfile.mkstemp(suffix='.png', dir=get_cache_dir())
+    try:
+        with os.fdopen(fd, 'wb') as temporary_file:
+            plt.savefig(temporary_file, format='png')
+        os.chmod(temporary_path, 0o644)
+        os.replace(temporary_path, get_graph_path(graph))
+    except Exception:
+        os.remove(temporary_path)
+        raise
+    finally:
+        plt.close()
+    set_latest_graph(latest_graph, graph)
+
+def render_graph_timed(graph, latest_graph, title, data, color):
+    start = time.perf_counter()
+    render_graph(graph, latest_graph, title, data, color)
+    return time.perf_counter() - start
+
+def evict_graphs():
+    try:
+        entries = [ entry for entry in os.scandir(get_cache_dir()) if GRAPH_NAME_REGEX.match(entry.name) != None ]
+    except OSError:
+        return
+    if len(entries) <= GRAPH_CACHE_MAX_FILES:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_atime)
+    for entry in entries[:len(entries) - GRAPH_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,106 @@
+from django.db import connection
+
+from .models import *
+
+LATEST_VALUE_INSERT_CHUNK_SIZE = 1000
+LATEST_VALUE_COLUMNS = [ 'component', 'key', 'datetime', 'value', 'num', 'unit' ]
+
+def get_newest_samples(samples):
+    newest_samples = {}
+    for component_id, key, sample_datetime, value, num, unit in samples:
+        sample_key = (component_id, key)
+        if not sample_key in newest_samples or sample_datetime >= newest_samples[sample_key][0]:
+            newest_samples[sample_key] = (sample_datetime, value, num, unit)
+    return newest_samples
+
+def upsert_latest_values_on_conflict(newest_samples):
+    columns = { name : connection.ops.quote_name(LatestValue._meta.get_field(name).column) for name in LATEST_VALUE_COLUMNS }
+    row = '(' + ', '.join(['%s'] * len(LATEST_VALUE_COLUMNS)) + ')'
+    sample_keys = sorted(newest_samples)
+    with connection.cursor() as cursor:
+        for start in range(0, len(sample_keys), LATEST_VALUE_INSERT_CHUNK_SIZE):
+            chunk = sample_keys[start:start + LATEST_VALUE_INSERT_CHUNK_SIZE]
+            params = []
+            for sample_key in chunk:
+                params += list(sample_key) + list(newest_samples[sample_key])
+            cursor.execute(
+                'INSERT INTO {table} AS latest ({columns}) VALUES {values} '
+                'ON CONFLICT ({component}, {key}) DO UPDATE SET '
+                '{datetime} = EXCLUDED.{datetime}, {value} = EXCLUDED.{value}, '
+                '{num} = EXCLUDED.{num}, {unit} = EXCLUDED.{unit} '
+                'WHERE EXCLUDED.{datetime} >= latest.{datetime}'.format(
+                    table=connection.ops.quote_name(LatestValue._meta.db_table),
+                    columns=', '.join([ columns[name] for name in LATEST_VALUE_COLUMNS ]),
+                    values=', '.join([row] * len(chunk)),
+                    **columns
+                ), params)
+
+def update_latest_values(samples):
+    newest_samples = get_newest_samples(samples)
+    if len(newest_samples) == 0:
+        return
+
+    if connection.vendor == 'postgresql':
+        upsert_latest_values_on_conflict(newest_samples)
+        return
+
+    existing_values = {}
+    for latest_value in LatestValue.objects.select_for_update().filter(
+    component__in=set(sample_key[0] for sample_key in newest_samples),
+    key__in=set(sample_key[1] for sample_key in newest_samples)):
+        existing_values[(latest_value.component_id, latest_value.key)] = latest_value
+
+    new_values = []
+    changed_values = []
+    for sample_key, (sample_datetime, value, num, unit) in newest_samples.items():
+        if sample_key in existing_values:
+            latest_value = existing_values[sample_key]
+            if sample_datetime < latest_value.datetime:
+                continue
+            changed_values.append(latest_value)
+        else:
+            latest_value = LatestValue()
+            latest_value.component_id, latest_value.key = sample_key
+            new_values.append(latest_value)
+        latest_value.datetime = sample_datetime
+        latest_value.value = value
+        latest_value.num = num
+        latest_value.unit = unit
+
+    LatestValue.objects.bulk_update(changed_values, ['datetime', 'value', 'num', 'unit'])
+    LatestValue.objects.bulk_create(new_values)
+
+def get_component_samples(component_id):
+    for key, batch_datetime, value, num, unit in Measurement.objects.filter(batch__component=component_id).values_list(
+        'key', 'batch__datetime', 'value', 'num', 'unit'
+    ).iterator():
+        yield component_id, key, batch_datetime, value, num, unit
+
+def rebuild_latest_values(component_id):
+    existing_values = {}
+    for latest_value in LatestValue.objects.select_for_update().filter(component=component_id):
+        existing_values[latest_value.key] = latest_value
+
+    newest_samples = get_newest_samples(get_component_samples(component_id))
+    new_values = []
+    changed_values = []
+    for (sample_component_id, key), (sample_datetime, value, num, unit) in newest_samples.items():
+        if key in existing_values:
+            latest_value = existing_values.pop(key)
+            changed_values.append(latest_value)
+        else:
+            latest_value = LatestValue()
+            latest_value.component_id, latest_value.key = sample_component_id, key
+            new_values.append(latest_value)
+        latest_value.datetime = sample_datetime
+        latest_value.value = value
+        latest_value.num = num
+        latest_value.unit = unit
+
+    LatestValue.objects.bulk_update(changed_values, ['datetime', 'value', 'num', 'unit'])
+    LatestValue.objects.bulk_create(new_values, ignore_conflicts=True)
+    LatestValue.objects.filter(id__in=[ latest_value.id for latest_value in existing_values.values() ]).delete()
+    return len(newest_samples)
+
+def get_latest_values(station, since):
+    return LatestValue.objects.filter(component__station=station.id, datetime__gt=since).order_by('id')
@@ -1,5 +1,5 @@
 from django.db.models import Model, CharField, FloatField, IntegerField, TextField, ManyToManyField, \
-                             DateTimeField, BooleanField, ForeignKey, CASCADE, SET_DEFAULT
+                             DateTimeField, BooleanField, ForeignKey, CASCADE, SET_DEFAULT, UniqueConstraint, Index
 from django.utils import timezone
 
 class Person(Model):
@@ -7,6 +7,17 @@ class Person(Model):
     phone = CharField(max_length=64, default='')
     email = CharField(max_length=64, default='')
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['name', 'phone', 'email'], name='unique_person'),
+        ]
+
+def normalize_person(name, phone, email):
+    name = ' '.join(str(name).split())
+    phone = ''.join(str(phone).split())
+    email = str(email).strip().lower()
+    return name, phone, email
+
 class Status(Model):
     name = CharField(max_length=64, default='Test Status')
     color = CharField(max_length=16, default='#00CC00')
@@ -42,7 +53,7 @@ class StatusWarning(Model):
     status = ForeignKey(Status, default=get_status_warning_issued, on_delete=CASCADE)
 
 class Station(Model):
-    security_token = CharField(max_length=64)
+    security_token = CharField(max_length=64, unique=True)
     name = CharField(max_length=64, default='Test Station')
     latitude = FloatField(default=0.0)
     longitude = FloatField(default=0.0)
@@ -52,6 +63,14 @@ class Station(Model):
     last_updated = DateTimeField(default=timezone.now)
     approved = BooleanField(default=False)
     status = ForeignKey(Status, default=get_status_default, on_delete=SET_DEFAULT)
+    maintainers_fingerprint = CharField(max_length=64, default='')
+    revision = IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            Index(fields=['approved'], name='station_approved_idx'),
+            Index(fields=['-last_updated', '-id'], name='station_last_updated_idx'),
+        ]
 
 class Component(Model):
     name = CharField(max_length=64, default='Test Component')
@@ -59,15 +78,80 @@ class Component(Model):
     old = BooleanField(default=False)
 
 class MeasurementBatch(Model):
-    datetime = DateTimeField(default=timezone.now)
+    datetime = DateTimeField(default=timezone.now, db_index=True)
     component = ForeignKey(Component, on_delete=CASCADE)
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['component', 'datetime'], name='unique_component_batch'),
+        ]
+
 class Measurement(Model):
     key = CharField(max_length=128, default='')
     value = CharField(max_length=128, default='')
+    num = FloatField(null=True, default=None)
+    unit = CharField(max_length=128, default='')
     batch = ForeignKey(MeasurementBatch, on_delete=CASCADE)
+    datetime = DateTimeField(default=timezone.now)
 
 class Error(Model):
     message = TextField(max_length=512, default='')
     component = ForeignKey(Component, on_delete=CASCADE)
     datetime = DateTimeField(default=timezone.now)
+
+class MeasurementRollup(Model):
+    component = ForeignKey(Component, on_delete=CASCADE)
+    key = CharField(max_length=128, default='')
+    resolution = IntegerField(default=60)
+    start = DateTimeField(default=timezone.now)
+    count = IntegerField(default=0)
+    minimum = FloatField(default=0.0)
+    maximum = FloatField(default=0.0)
+    total = FloatField(default=0.0)
+    last = FloatField(default=0.0)
+    last_datetime = DateTimeField(default=timezone.now)
+    unit = CharField(max_length=128, default='')
+    mixed = BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['component', 'key', 'resolution', 'start'], name='unique_measurement_rollup'),
+        ]
+
+class LatestValue(Model):
+    component = ForeignKey(Component, on_delete=CASCADE)
+    key = CharField(max_length=128, default='')
+    value = CharField(max_length=128, default='')
+    num = FloatField(null=True, default=None)
+    unit = CharField(max_length=128, default='')
+    datetime = DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['component', 'key'], name='unique_latest_value'),
+        ]
+
+class DirtyStation(Model):
+    station = ForeignKey(Station, on_delete=CASCADE)
+    marked = DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['station'], name='unique_dirty_station'),
+        ]
+        indexes = [
+            Index(fields=['marked'], name='dirty_station_marked_idx'),
+        ]
+
+class DirtyComponent(Model):
+    component = ForeignKey(Component, on_delete=CASCADE)
+    marked = DateTimeField(default=timezone.now)
+    uploads = IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['component'], name='unique_dirty_component'),
+        ]
+        indexes = [
+            Index(fields=['marked'], name='dirty_component_marked_idx'),
+        ]
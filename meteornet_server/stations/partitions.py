@@ -0,0 +1,196 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from datetime import datetime
+import re
+
+from .models import *
+
+PARTITIONED_MODELS = [ MeasurementBatch, Measurement ]
+PARTITION_MONTHS_AHEAD = 3
+
+def quote_name(name):
+    return connection.ops.quote_name(name)
+
+def is_supported():
+    return connection.vendor == 'postgresql' and connection.pg_version >= 110000
+
+def is_partitioned():
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))',
+            [ MeasurementBatch._meta.db_table ]
+        )
+        return cursor.fetchone()[0]
+
+def get_month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+def add_months(month_start, months):
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def get_partition_name(model, month_start):
+    return '{}_p{:04d}{:02d}'.format(model._meta.db_table, month_start.year, month_start.month)
+
+def get_default_partition_name(model):
+    return model._meta.db_table + '_default'
+
+def get_partitions(model):
+    partition_regex = re.compile('^' + re.escape(model._meta.db_table) + '_p(\\d{4})(\\d{2})$')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+            [ model._meta.db_table ]
+        )
+        names = [ row[0] for row in cursor.fetchall() ]
+
+    partitions = {}
+    for name in names:
+        match = partition_regex.match(name)
+        if match != None:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)] = name
+    return partitions
+
+def create_partition(model, month_start):
+    table = quote_name(model._meta.db_table)
+    default_partition = quote_name(get_default_partition_name(model))
+    moved = quote_name(model._meta.db_table + '_moved')
+    month_end = add_months(month_start, 1)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TEMPORARY TABLE {} (LIKE {}) ON COMMIT DROP'.format(moved, table))
+            cursor.execute(
+                'WITH moved_rows AS (DELETE FROM {} WHERE datetime >= %s AND datetime < %s RETURNING *) '
+                'INSERT INTO {} SELECT * FROM moved_rows'.format(default_partition, moved),
+                [ month_start, month_end ]
+            )
+            cursor.execute('CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)'.format(
+                quote_name(get_partition_name(model, month_start)), table
+            ), [ month_start, month_end ])
+            cursor.execute('INSERT INTO {} SELECT * FROM {}'.format(table, moved))
+
+def create_partitions_for(model, first_month, last_month):
+    created = []
+    partitions = get_partitions(model)
+    month_start = first_month
+    while month_start <= last_month:
+        if not month_start in partitions:
+            create_partition(model, month_start)
+            created.append(get_partition_name(model, month_start))
+        month_start = add_months(month_start, 1)
+    return created
+
+def create_partitions(first_month, last_month):
+    created = []
+    for model in PARTITIONED_MODELS:
+        created += create_partitions_for(model, first_month, last_month)
+    return created
+
+def create_partitions_ahead(months=PARTITION_MONTHS_AHEAD):
+    current_month = get_month_start(timezone.now())
+    return create_partitions(current_month, add_months(current_month, months))
+
+def drop_old_partitions(cutoff, detach=False):
+    removed = []
+    for model in reversed(PARTITIONED_MODELS):
+        for month_start, name in sorted(get_partitions(model).items()):
+            if add_months(month_start, 1) > cutoff:
+                continue
+            with connection.cursor() as cursor:
+                if detach:
+                    cursor.execute('ALTER TABLE {} DETACH PARTITION {}'.format(
+                        quote_name(model._meta.db_table), quote_name(name)
+                    ))
+                else:
+                    cursor.execute('DROP TABLE {}'.format(quote_name(name)))
+            removed.append(name)
+    return removed
+
+def drop_batch_foreign_key():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND confrelid = to_regclass(%s) AND contype = 'f'",
+            [ Measurement._meta.db_table, MeasurementBatch._meta.db_table ]
+        )
+        for row in cursor.fetchall():
+            cursor.execute('ALTER TABLE {} DROP CONSTRAINT {}'.format(
+                quote_name(Measurement._meta.db_table), quote_name(row[0])
+            ))
+
+def convert_table(model, progress=None):
+    table = model._meta.db_table
+    unpartitioned = table + '_unpartitioned'
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE'.format(quote_name(table)))
+            cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [ table, 'id' ])
+            sequence = cursor.fetchone()[0]
+            cursor.execute(
+                'SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE i.indrelid = to_regclass(%s) AND NOT i.indisunique',
+                [ table ]
+            )
+            indexes = cursor.fetchall()
+            for i, (name, definition) in enumerate(indexes):
+                cursor.execute('ALTER INDEX {} RENAME TO {}'.format(quote_name(name), quote_name(unpartitioned + '_' + str(i))))
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype IN ('u', 'f', 'c')",
+                [ table ]
+            )
+            constraints = cursor.fetchall()
+            for i, (name, definition) in enumerate(constraints):
+                cursor.execute('ALTER TABLE {} RENAME CONSTRAINT {} TO {}'.format(
+                    quote_name(table), quote_name(name), quote_name(unpartitioned + '_constraint_' + str(i))
+                ))
+            cursor.execute('ALTER TABLE {} RENAME TO {}'.format(quote_name(table), quote_name(unpartitioned)))
+            cursor.execute('CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS) PARTITION BY RANGE (datetime)'.format(
+                quote_name(table), quote_name(unpartitioned)
+            ))
+            cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} PRIMARY KEY (id, datetime)'.format(
+                quote_name(table), quote_name(table + '_part_pkey')
+            ))
+            if sequence != None:
+                cursor.execute('ALTER SEQUENCE {} OWNED BY {}.id'.format(sequence, quote_name(table)))
+            for name, definition in indexes:
+                cursor.execute('CREATE INDEX {} ON {} USING {}'.format(
+                    quote_name(name), quote_name(table), definition.split(' USING ', 1)[1]
+                ))
+            for name, definition in constraints:
+                cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(quote_name(table), quote_name(name), definition))
+            cursor.execute('CREATE TABLE {} PARTITION OF {} DEFAULT'.format(
+                quote_name(get_default_partition_name(model)), quote_name(table)
+            ))
+            cursor.execute('SELECT MIN(datetime) FROM {}'.format(quote_name(unpartitioned)))
+            oldest = cursor.fetchone()[0]
+
+    current_month = get_month_start(timezone.now())
+    first_month = get_month_start(oldest) if oldest != None and oldest < current_month else current_month
+    create_partitions_for(model, first_month, add_months(current_month, PARTITION_MONTHS_AHEAD))
+
+    month_start = first_month
+    while month_start <= current_month:
+        month_end = add_months(month_start, 1)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'WITH moved_rows AS (DELETE FROM {} WHERE datetime >= %s AND datetime < %s RETURNING *) '
+                    'INSERT INTO {} SELECT * FROM moved_rows'.format(quote_name(unpartitioned), quote_name(table)),
+                    [ month_start, month_end ]
+                )
+                moved_count = cursor.rowcount
+        if progress != None:
+            progress(table, month_start, moved_count)
+        month_start = month_end
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO {} SELECT * FROM {}'.format(quote_name(table), quote_name(unpartitioned)))
+            cursor.execute('DROP TABLE {}'.format(quote_name(unpartitioned)))
+
+def convert(progress=None):
+    drop_batch_foreign_key()
+    for model in PARTITIONED_MODELS:
+        convert_table(model, progress)
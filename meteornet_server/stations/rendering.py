@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import threading
+import logging
+import time
+
+from .models import *
+from . import stations, graphs, graph_queue, fragments
+
+GRAPH_POLL_SECONDS = 10
+GRAPH_RENDER_WORKERS = 2
+GRAPH_MAX_CONCURRENT_RENDERS = 8
+GRAPH_STATS_SECONDS = 300
+
+logger = logging.getLogger(__name__)
+
+class GraphRenderer:
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(GRAPH_MAX_CONCURRENT_RENDERS)
+        self.executor = ProcessPoolExecutor(
+            max_workers=GRAPH_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+        self.stats_lock = threading.Lock()
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.renders = 0
+        self.render_failures = 0
+        self.render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.skipped_renders = 0
+        self.last_stats_log = time.monotonic()
+
+    def poll(self):
+        dirty_components = graph_queue.take_dirty_components()
+        station_components = OrderedDict()
+        for component_id, station_id, uploads in dirty_components:
+            station_components.setdefault(station_id, []).append(component_id)
+        with self.stats_lock:
+            self.queue_depth = len(dirty_components)
+            self.max_queue_depth = max(self.max_queue_depth, len(dirty_components))
+            self.skipped_renders += sum([ uploads - 1 for _, _, uploads in dirty_components ])
+
+        futures = []
+        rendered_station_ids = []
+        for station_id, component_ids in station_components.items():
+            station_futures = self.render_station(station_id, component_ids)
+            if len(station_futures) > 0:
+                rendered_station_ids.append(station_id)
+            futures += station_futures
+        if len(futures) > 0:
+            wait(futures)
+            graphs.evict_graphs()
+            fragments.bump(rendered_station_ids)
+
+        if time.monotonic() - self.last_stats_log >= GRAPH_STATS_SECONDS:
+            self.log_stats()
+        return len(dirty_components)
+
+    def render_station(self, station_id, component_ids):
+        station = Station.objects.filter(id=station_id).first()
+        if station == None:
+            return []
+
+        futures = []
+        for graph_job in stations.get_graph_jobs(stations.get_component_series(station, component_ids)):
+            self.slots.acquire()
+            future = self.executor.submit(graphs.render_graph_timed, *graph_job)
+            future.add_done_callback(self.render_done)
+            futures.append(future)
+        return futures
+
+    def render_done(self, future):
+        self.slots.release()
+        with self.stats_lock:
+            if future.exception() != None:
+                self.render_failures += 1
+                logger.error('Graph rendering failed: %s', future.exception())
+                return
+            seconds = future.result()
+            self.renders += 1
+            self.render_seconds += seconds
+            self.max_render_seconds = max(self.max_render_seconds, seconds)
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {
+                'queue_depth' : self.queue_depth,
+                'max_queue_depth' : self.max_queue_depth,
+                'renders' : self.renders,
+                'render_failures' : self.render_failures,
+                'average_render_seconds' : self.render_seconds / self.renders if self.renders > 0 else 0.0,
+                'max_render_seconds' : self.max_render_seconds,
+                'skipped_renders' : self.skipped_renders,
+            }
+
+    def log_stats(self):
+        self.last_stats_log = time.monotonic()
+        stats = self.get_stats()
+        logger.info(
+            'Graph rendering: queue depth %d (max %d), %d renders, %d failed, %.3f s average, %.3f s max, %d skipped by coalescing',
+            stats['queue_depth'], stats['max_queue_depth'], stats['renders'], stats['render_failures'],
+            stats['average_render_seconds'], stats['max_render_seconds'], stats['skipped_renders']
+        )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.log_stats()
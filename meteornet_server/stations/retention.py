@@ -0,0 +1,122 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+import logging
+import time
+
+from .models import *
+
+RETENTION_CHUNK_SIZE = 500
+DEDUPLICATION_CHUNK_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+def delete_batches(batch_ids, cutoff=None):
+    placeholders = ', '.join(['%s'] * len(batch_ids))
+    with connection.cursor() as cursor:
+        if cutoff != None:
+            cursor.execute('DELETE FROM {} WHERE {} IN ({}) AND {} < %s'.format(
+                connection.ops.quote_name(Measurement._meta.db_table),
+                connection.ops.quote_name(Measurement._meta.get_field('batch').column),
+                placeholders,
+                connection.ops.quote_name(Measurement._meta.get_field('datetime').column)
+            ), batch_ids + [ cutoff ])
+        else:
+            cursor.execute('DELETE FROM {} WHERE {} IN ({})'.format(
+                connection.ops.quote_name(Measurement._meta.db_table),
+                connection.ops.quote_name(Measurement._meta.get_field('batch').column),
+                placeholders
+            ), batch_ids)
+        measurement_count = cursor.rowcount
+        cursor.execute('DELETE FROM {} WHERE {} IN ({})'.format(
+            connection.ops.quote_name(MeasurementBatch._meta.db_table),
+            connection.ops.quote_name(MeasurementBatch._meta.pk.column),
+            placeholders
+        ), batch_ids)
+        batch_count = cursor.rowcount
+    return batch_count, measurement_count
+
+def delete_batch_chunk(cutoff, chunk_size):
+    with transaction.atomic():
+        batch_ids = list(MeasurementBatch.objects.filter(datetime__lt=cutoff).order_by('datetime', 'id').values_list(
+            'id', flat=True
+        )[:chunk_size])
+        if len(batch_ids) == 0:
+            return 0, 0
+        return delete_batches(batch_ids, cutoff)
+
+def delete_old_batches(cutoff, chunk_size=RETENTION_CHUNK_SIZE, stopped=None, progress=None):
+    start = time.monotonic()
+    deleted_batches = 0
+    deleted_measurements = 0
+    while stopped == None or not stopped.is_set():
+        batch_count, measurement_count = delete_batch_chunk(cutoff, chunk_size)
+        if batch_count == 0:
+            break
+        deleted_batches += batch_count
+        deleted_measurements += measurement_count
+        if progress != None:
+            progress(deleted_batches, deleted_measurements, time.monotonic() - start)
+
+    elapsed = time.monotonic() - start
+    logger.info(
+        'Retention: deleted %d batches and %d measurements older than %s in %.1f s (%.0f rows/s)',
+        deleted_batches, deleted_measurements, cutoff, elapsed,
+        (deleted_batches + deleted_measurements) / max(elapsed, 0.001)
+    )
+    return deleted_batches, deleted_measurements
+
+def delete_orphan_persons(chunk_size=RETENTION_CHUNK_SIZE):
+    maintained = Station.maintainers.through.objects.filter(person=OuterRef('pk'))
+    last_id = 0
+    deleted_persons = 0
+    while True:
+        with transaction.atomic():
+            person_ids = list(Person.objects.select_for_update(skip_locked=True).annotate(
+                maintained=Exists(maintained)
+            ).filter(id__gt=last_id, maintained=False).order_by('id').values_list('id', flat=True)[:chunk_size])
+            if len(person_ids) == 0:
+                break
+            deleted_persons += Person.objects.filter(id__in=person_ids, station=None).delete()[1].get(Person._meta.label, 0)
+        last_id = person_ids[-1]
+
+    logger.info('Retention: deleted %d persons that no longer maintain any station', deleted_persons)
+    return deleted_persons
+
+def delete_duplicate_chunk(after_id, chunk_size):
+    earlier_batches = MeasurementBatch.objects.filter(
+        component=OuterRef('component'), datetime=OuterRef('datetime'), id__lt=OuterRef('id')
+    )
+    with transaction.atomic():
+        rows = list(MeasurementBatch.objects.filter(id__gt=after_id).order_by('id').annotate(
+            duplicate=Exists(earlier_batches)
+        ).values_list('id', 'duplicate')[:chunk_size])
+        if len(rows) == 0:
+            return None, 0, 0
+
+        duplicate_ids = [ batch_id for batch_id, duplicate in rows if duplicate ]
+        if len(duplicate_ids) == 0:
+            return rows[-1][0], 0, 0
+        batch_count, measurement_count = delete_batches(duplicate_ids)
+    return rows[-1][0], batch_count, measurement_count
+
+def delete_duplicate_batches(chunk_size=DEDUPLICATION_CHUNK_SIZE, stopped=None, progress=None):
+    start = time.monotonic()
+    last_id = 0
+    deleted_batches = 0
+    deleted_measurements = 0
+    while stopped == None or not stopped.is_set():
+        chunk_last_id, batch_count, measurement_count = delete_duplicate_chunk(last_id, chunk_size)
+        if chunk_last_id == None:
+            break
+        last_id = chunk_last_id
+        deleted_batches += batch_count
+        deleted_measurements += measurement_count
+        if progress != None:
+            progress(last_id, deleted_batches, deleted_measurements, time.monotonic() - start)
+
+    logger.info(
+        'Deduplication: deleted %d duplicate batches and %d measurements in %.1f s',
+        deleted_batches, deleted_measurements, time.monotonic() - start
+    )
+    return deleted_batches, deleted_measurements
@@ -0,0 +1,160 @@
+from django.utils import timezone
+from django.db import transaction, connection, IntegrityError
+
+from datetime import datetime, timedelta
+
+from .models import *
+
+ROLLUP_RESOLUTIONS = [ 60, 3600, 86400 ]
+ROLLUP_RETENTION_DAYS = { 60 : 365, 3600 : None, 86400 : None }
+ROLLUP_INSERT_CHUNK_SIZE = 1000
+ROLLUP_DELETE_CHUNK_SIZE = 5000
+ROLLUP_COLUMNS = [ 'component', 'key', 'resolution', 'start', 'count', 'minimum', 'maximum', 'total', 'last', 'last_datetime', 'unit', 'mixed' ]
+
+def get_bucket_start(sample_datetime, resolution):
+    timestamp = int(sample_datetime.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % resolution, timezone.utc)
+
+def add_sample(rollup, sample_datetime, num, unit):
+    if num == None:
+        rollup.mixed = True
+        return
+    if rollup.count == 0:
+        rollup.minimum = num
+        rollup.maximum = num
+    else:
+        if unit != rollup.unit:
+            rollup.mixed = True
+        rollup.minimum = min(rollup.minimum, num)
+        rollup.maximum = max(rollup.maximum, num)
+    rollup.count += 1
+    rollup.total += num
+    if rollup.count == 1 or sample_datetime >= rollup.last_datetime:
+        rollup.last = num
+        rollup.last_datetime = sample_datetime
+        rollup.unit = unit
+
+def get_buckets(samples):
+    buckets = {}
+    for component_id, key, sample_datetime, num, unit in samples:
+        for resolution in ROLLUP_RESOLUTIONS:
+            bucket = (component_id, key, resolution, get_bucket_start(sample_datetime, resolution))
+            if not bucket in buckets:
+                buckets[bucket] = []
+            buckets[bucket].append((sample_datetime, num, unit))
+    return buckets
+
+def add_samples(rollup, bucket_samples):
+    for sample_datetime, num, unit in sorted(bucket_samples, key=lambda sample: sample[0]):
+        add_sample(rollup, sample_datetime, num, unit)
+
+def upsert_rollups_on_conflict(buckets):
+    columns = { name : connection.ops.quote_name(MeasurementRollup._meta.get_field(name).column) for name in ROLLUP_COLUMNS }
+    attnames = [ MeasurementRollup._meta.get_field(name).attname for name in ROLLUP_COLUMNS ]
+    row = '(' + ', '.join(['%s'] * len(ROLLUP_COLUMNS)) + ')'
+    rollups = []
+    for bucket in sorted(buckets):
+        rollup = MeasurementRollup()
+        rollup.component_id, rollup.key, rollup.resolution, rollup.start = bucket
+        add_samples(rollup, buckets[bucket])
+        rollups.append(rollup)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rollups), ROLLUP_INSERT_CHUNK_SIZE):
+            chunk = rollups[start:start + ROLLUP_INSERT_CHUNK_SIZE]
+            params = []
+            for rollup in chunk:
+                params += [ getattr(rollup, attname) for attname in attnames ]
+            cursor.execute(
+                'INSERT INTO {table} AS rollup ({columns}) VALUES {values} '
+                'ON CONFLICT ({component}, {key}, {resolution}, {start}) DO UPDATE SET '
+                '{count} = rollup.{count} + EXCLUDED.{count}, '
+                '{minimum} = LEAST(rollup.{minimum}, EXCLUDED.{minimum}), '
+                '{maximum} = GREATEST(rollup.{maximum}, EXCLUDED.{maximum}), '
+                '{total} = rollup.{total} + EXCLUDED.{total}, '
+                '{last} = CASE WHEN EXCLUDED.{last_datetime} >= rollup.{last_datetime} THEN EXCLUDED.{last} ELSE rollup.{last} END, '
+                '{unit} = CASE WHEN EXCLUDED.{last_datetime} >= rollup.{last_datetime} THEN EXCLUDED.{unit} ELSE rollup.{unit} END, '
+                '{mixed} = rollup.{mixed} OR EXCLUDED.{mixed} OR (rollup.{count} > 0 AND EXCLUDED.{count} > 0 AND rollup.{unit} != EXCLUDED.{unit}), '
+                '{last_datetime} = GREATEST(rollup.{last_datetime}, EXCLUDED.{last_datetime})'.format(
+                    table=connection.ops.quote_name(MeasurementRollup._meta.db_table),
+                    columns=', '.join([ columns[name] for name in ROLLUP_COLUMNS ]),
+                    values=', '.join([row] * len(chunk)),
+                    **columns
+                ), params)
+
+def upsert_rollup(bucket, bucket_samples):
+    component_id, key, resolution, bucket_start = bucket
+    try:
+        with transaction.atomic():
+            rollup = MeasurementRollup(component_id=component_id, key=key, resolution=resolution, start=bucket_start)
+            add_samples(rollup, bucket_samples)
+            rollup.save()
+    except IntegrityError:
+        rollup = MeasurementRollup.objects.select_for_update().get(
+            component=component_id, key=key, resolution=resolution, start=bucket_start
+        )
+        add_samples(rollup, bucket_samples)
+        rollup.save()
+
+def update_rollups(samples):
+    buckets = get_buckets(samples)
+    if len(buckets) == 0:
+        return
+
+    if connection.vendor == 'postgresql':
+        upsert_rollups_on_conflict(buckets)
+        return
+
+    existing_rollups = {}
+    for rollup in MeasurementRollup.objects.select_for_update().filter(
+    component__in=set(bucket[0] for bucket in buckets),
+    key__in=set(bucket[1] for bucket in buckets),
+    start__in=set(bucket[3] for bucket in buckets)):
+        existing_rollups[(rollup.component_id, rollup.key, rollup.resolution, rollup.start)] = rollup
+
+    changed_rollups = []
+    for bucket in sorted(buckets):
+        if bucket in existing_rollups:
+            rollup = existing_rollups[bucket]
+            add_samples(rollup, buckets[bucket])
+            changed_rollups.append(rollup)
+        else:
+            upsert_rollup(bucket, buckets[bucket])
+
+    MeasurementRollup.objects.bulk_update(
+        changed_rollups, ['count', 'minimum', 'maximum', 'total', 'last', 'last_datetime', 'unit', 'mixed']
+    )
+
+def get_rollup_points(station, component_name, key, resolution, start, end):
+    rows = MeasurementRollup.objects.filter(
+        component__station=station.id,
+        component__name=component_name,
+        key=key,
+        resolution=resolution,
+        start__gte=get_bucket_start(start, resolution),
+        start__lte=end
+    ).order_by('start').values_list('start', 'count', 'total', 'unit', 'mixed')
+    points = []
+    for bucket_start, count, total, unit, mixed in rows:
+        if mixed:
+            points.append((bucket_start, '', None, unit))
+        else:
+            num = total / count
+            points.append((bucket_start, '{:.2f}{}'.format(num, unit), num, unit))
+    return points
+
+def delete_old_rollups(chunk_size=ROLLUP_DELETE_CHUNK_SIZE):
+    deleted_rollups = 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        if ROLLUP_RETENTION_DAYS[resolution] == None:
+            continue
+        cutoff = timezone.now() - timedelta(days=ROLLUP_RETENTION_DAYS[resolution])
+        while True:
+            with transaction.atomic():
+                rollup_ids = list(MeasurementRollup.objects.filter(
+                    resolution=resolution, start__lt=cutoff
+                ).values_list('id', flat=True)[:chunk_size])
+                if len(rollup_ids) == 0:
+                    break
+                deleted_rollups += MeasurementRollup.objects.filter(id__in=rollup_ids).delete()[0]
+    return deleted_rollups
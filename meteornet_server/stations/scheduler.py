@@ -0,0 +1,71 @@
+from django.utils import timezone
+
+from datetime import timedelta
+import heapq
+
+from .models import *
+from . import stations
+
+STATUS_SWEEP_SECONDS = 3600
+
+class StatusScheduler:
+
+    def __init__(self):
+        self.deadlines = []
+        self.armed = {}
+        self.next_sweep = None
+
+    def get_next_deadline(self, last_updated, now):
+        for hours in sorted([stations.NOT_CONNECTING_HOURS, stations.DISCONNECTED_HOURS]):
+            deadline = last_updated + timedelta(hours=hours + 1)
+            if deadline > now:
+                return deadline
+        return None
+
+    def arm(self, station_id, last_updated, now):
+        deadline = self.get_next_deadline(last_updated, now)
+        if deadline == None:
+            self.armed.pop(station_id, None)
+            return
+        if station_id in self.armed and self.armed[station_id][0] == deadline:
+            return
+        self.armed[station_id] = (deadline, last_updated)
+        heapq.heappush(self.deadlines, (deadline, station_id))
+
+    def sweep(self, now):
+        stations.update_statuses()
+        self.deadlines = []
+        self.armed = {}
+        for station_id, last_updated in Station.objects.filter(approved=True).values_list('id', 'last_updated'):
+            self.arm(station_id, last_updated, now)
+        self.next_sweep = now + timedelta(seconds=STATUS_SWEEP_SECONDS)
+
+    def pop_expired(self, now):
+        expired = {}
+        while len(self.deadlines) > 0 and self.deadlines[0][0] <= now:
+            deadline, station_id = heapq.heappop(self.deadlines)
+            if station_id in self.armed and self.armed[station_id][0] == deadline:
+                expired[station_id] = self.armed.pop(station_id)[1]
+        return expired
+
+    def run_due(self):
+        now = timezone.now()
+        if self.next_sweep == None or now >= self.next_sweep:
+            self.sweep(now)
+            return
+
+        expired = self.pop_expired(now)
+        if len(expired) == 0:
+            return
+        for station in Station.objects.filter(id__in=list(expired), approved=True):
+            if station.last_updated == expired[station.id]:
+                stations.update_status(station)
+            self.arm(station.id, station.last_updated, now)
+
+    def get_timeout(self):
+        wake = self.next_sweep
+        if len(self.deadlines) > 0 and (wake == None or self.deadlines[0][0] < wake):
+            wake = self.deadlines[0][0]
+        if wake == None:
+            return 0
+        return max((wake - timezone.now()).total_seconds(), 0)
@@ -0,0 +1,113 @@
+import numpy as np
+import math
+import re
+
+GAP_FACTOR = 2.5
+NUMBER_PREFIX_REGEX = re.compile('\\d+(?:\\.\\d*)?\\s*')
+
+def extract_num_unit(string_value):
+    string_value = str(string_value)
+    match = NUMBER_PREFIX_REGEX.match(string_value)
+    if match == None:
+        return float('NaN'), string_value
+    return float(match.group()), string_value[match.end():]
+
+def parse_value(value):
+    num, unit = extract_num_unit(value)
+    if math.isnan(num):
+        return None, ''
+    return num, unit
+
+def get_timestamps(datetimes):
+    return np.fromiter((x.timestamp() for x in datetimes), dtype=float, count=len(datetimes))
+
+def get_median_interval(datetimes):
+    if len(datetimes) < 2:
+        return 0.0
+    intervals = np.diff(get_timestamps(datetimes))
+    middle = len(intervals) // 2
+    return float(np.partition(intervals, middle)[middle])
+
+def get_segments(timestamps, median_interval):
+    starts = np.flatnonzero(np.diff(timestamps) > GAP_FACTOR * median_interval) + 1
+    bounds = [0] + starts.tolist() + [len(timestamps)]
+    return [ (bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) ]
+
+def intern_classes(labels):
+    classes, first_indices, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    order = np.argsort(first_indices, kind='stable')
+    class_ids = np.empty(len(order), dtype=int)
+    class_ids[order] = np.arange(1, len(order) + 1)
+    return class_ids[inverse], classes[order].tolist()
+
+def get_categorical(points):
+    nums = np.array([point[2] for point in points], dtype=float)
+    units = np.array([point[3] for point in points], dtype=object)
+    categorical = np.isnan(nums)
+    categorical[1:] |= units[1:] != units[:-1]
+    return nums, units, categorical
+
+def is_categorical(points):
+    return get_categorical(points)[2].any()
+
+def build_series(points, median_interval):
+    xs = [point[0] for point in points]
+    timestamps = get_timestamps(xs)
+    nums, units, categorical = get_categorical(points)
+
+    data = { 'x' : xs, 'timestamps' : timestamps, 'segments' : get_segments(timestamps, median_interval) }
+
+    if not categorical.any():
+        data['y'] = np.array([ round(num, 2) for num in nums.tolist() ], dtype=float)
+        if len(units) > 0:
+            data['unit'] = units[-1]
+    else:
+        first_categorical = int(np.argmax(categorical))
+        labels = np.empty(len(points), dtype=object)
+        for i in range(first_categorical):
+            labels[i] = str(round(points[i][2], 2)) + points[i][3]
+        labels[first_categorical:] = [point[1] for point in points[first_categorical:]]
+        data['y'], data['classes'] = intern_classes(labels)
+        data['class_ids'] = list(range(1, len(data['classes']) + 1))
+
+    changes = data['y'][1:] != data['y'][:-1]
+    for start, end in data['segments'][1:]:
+        changes[start - 1] = False
+    data['constant'] = not changes.any()
+    return data
+
+def lttb(xs, ys, threshold):
+    if threshold >= len(xs):
+        return np.arange(len(xs))
+    if threshold < 3:
+        return np.array([0, len(xs) - 1])
+
+    sampled = np.empty(threshold, dtype=int)
+    sampled[0] = 0
+    sampled[-1] = len(xs) - 1
+    bounds = (np.arange(threshold - 1) * (len(xs) - 2) / (threshold - 2)).astype(int) + 1
+    bounds[-1] = len(xs) - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            average_start, average_end = end, bounds[i + 2]
+        else:
+            average_start, average_end = end, len(xs)
+        average_x = xs[average_start:average_end].mean()
+        average_y = ys[average_start:average_end].mean()
+
+        areas = np.abs((xs[a] - average_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (average_y - ys[a]))
+        a = start + int(np.argmax(areas))
+        sampled[i + 1] = a
+    return sampled
+
+def downsample(data, point_budget):
+    indices = lttb(data['timestamps'], data['y'].astype(float), point_budget)
+    if len(indices) == 0:
+        return [], [], []
+
+    segment_ids = np.repeat(np.arange(len(data['segments'])), [ end - start for start, end in data['segments'] ])[indices]
+    bounds = [0] + (np.flatnonzero(np.diff(segment_ids)) + 1).tolist() + [len(indices)]
+    segments = [ [bounds[i], bounds[i + 1]] for i in range(len(bounds) - 1) ]
+    return data['timestamps'][indices].astype(int).tolist(), data['y'][indices].tolist(), segments
@@ -0,0 +1,136 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+import math
+import json
+import hashlib
+
+from .models import *
+
+MAP_CACHE_KEY = 'station_map'
+MAP_CACHE_SECONDS = 600
+MAP_MAX_ZOOM = 18
+MAP_DEFAULT_ZOOM = 7
+MAP_CLUSTER_CELLS_PER_TILE = 4
+MAP_MAX_LATITUDE = 85.05112878
+
+def get_view(positions):
+    center = { 'longitude' : 0, 'latitude' : 0 }
+    zoom_level = 1
+    if len(positions) == 0:
+        return center, zoom_level
+
+    center['longitude'] = sum([ longitude for latitude, longitude in positions ]) / len(positions)
+    center['latitude'] = sum([ latitude for latitude, longitude in positions ]) / len(positions)
+    max_distance = max([
+        math.sqrt((center['longitude'] - longitude) ** 2 + (center['latitude'] - latitude) ** 2)
+        for latitude, longitude in positions
+    ])
+    if max_distance > 0:
+        zoom_level = min(-math.log(256 * max_distance / 40000000 * 100), MAP_DEFAULT_ZOOM)
+    else:
+        zoom_level = MAP_DEFAULT_ZOOM
+    return center, zoom_level
+
+def get_tile_position(latitude, longitude):
+    latitude = max(min(latitude, MAP_MAX_LATITUDE), -MAP_MAX_LATITUDE)
+    x = (longitude + 180) / 360
+    y = (1 - math.log(math.tan(math.radians(latitude)) + 1 / math.cos(math.radians(latitude))) / math.pi) / 2
+    return min(max(x, 0), 1), min(max(y, 0), 1)
+
+def get_clusters(stations, zoom):
+    cells = 2 ** zoom * MAP_CLUSTER_CELLS_PER_TILE
+    clusters = {}
+    for station in stations:
+        x, y = station['tile']
+        cell = (min(int(x * cells), cells - 1), min(int(y * cells), cells - 1))
+        clusters.setdefault(cell, []).append(station)
+    return [ clusters[cell] for cell in sorted(clusters) ]
+
+def make_feature(members):
+    longitude = sum([ station['longitude'] for station in members ]) / len(members)
+    latitude = sum([ station['latitude'] for station in members ]) / len(members)
+    return {
+        'type' : 'Feature',
+        'geometry' : { 'type' : 'Point', 'coordinates' : [ round(longitude, 6), round(latitude, 6) ] },
+        'properties' : { 'count' : len(members) },
+    }
+
+def get_stations():
+    stations = []
+    for latitude, longitude in Station.objects.filter(approved=True).order_by('id').values_list('latitude', 'longitude'):
+        stations.append({
+            'latitude' : latitude,
+            'longitude' : longitude,
+            'tile' : get_tile_position(latitude, longitude),
+        })
+    return stations
+
+def get_payload(features, view):
+    return json.dumps({
+        'type' : 'FeatureCollection',
+        'features' : features,
+        'view' : view,
+    }, separators=(',', ':')).encode()
+
+def build_map(zoom):
+    stations = get_stations()
+    center, zoom_level = get_view([ (station['latitude'], station['longitude']) for station in stations ])
+    features = [ make_feature(members) for members in get_clusters(stations, zoom) ]
+    view = { 'center' : center, 'zoom' : zoom_level }
+    payload = get_payload(features, view)
+    return { 'features' : features, 'view' : view, 'payload' : payload, 'etag' : hashlib.sha256(payload).hexdigest() }
+
+def normalize_longitude(longitude):
+    return (longitude + 180) % 360 - 180
+
+def get_bbox(west, south, east, north):
+    if not all([ math.isfinite(value) for value in (west, south, east, north) ]) or south > north:
+        return None
+    south = max(south, -90)
+    north = min(north, 90)
+    if east - west >= 360:
+        return (-180, south, 180, north)
+    return (normalize_longitude(west), south, normalize_longitude(east), north)
+
+def in_bbox(feature, bbox):
+    longitude, latitude = feature['geometry']['coordinates']
+    west, south, east, north = bbox
+    if not (south <= latitude <= north):
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+def get_cache_key(zoom):
+    return '{}_{}'.format(MAP_CACHE_KEY, zoom)
+
+def get_map(zoom):
+    zoom = min(max(zoom, 0), MAP_MAX_ZOOM)
+    station_map = cache.get(get_cache_key(zoom))
+    if station_map == None:
+        station_map = build_map(zoom)
+        cache.set(get_cache_key(zoom), station_map, MAP_CACHE_SECONDS)
+    return station_map
+
+def get_etag(zoom, bbox):
+    etag = get_map(zoom)['etag']
+    if bbox == None:
+        return etag
+    return hashlib.sha256(json.dumps([ etag, bbox ]).encode()).hexdigest()
+
+def get_map_payload(zoom, bbox):
+    station_map = get_map(zoom)
+    if bbox == None:
+        return station_map['payload']
+    return get_payload([ feature for feature in station_map['features'] if in_bbox(feature, bbox) ], station_map['view'])
+
+def invalidate():
+    transaction.on_commit(lambda: cache.delete_many([ get_cache_key(zoom) for zoom in range(MAP_MAX_ZOOM + 1) ]))
+
+@receiver(post_delete, sender=Station)
+def station_deleted(sender, instance, **kwargs):
+    if instance.approved:
+        invalidate()
@@ -2,178 +2,204 @@ from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from django.utils.timezone import make_aware, localtime
+from django.utils.dateparse import parse_datetime
 from django.db import transaction, connection
+from django.db.models import Exists, OuterRef, Q
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.core import mail
 from django.core.validators import validate_email
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
 from datetime import timedelta, datetime
-from os import path
 import uuid
 import json
-import math
-import matplotlib
-matplotlib.use('WebAgg')
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
-from pandas.plotting import register_matplotlib_converters
-register_matplotlib_converters()
-import seaborn as sns
-sns.set()
-import random
-import ast
-import re
+import hashlib
+import sys
 
 from .models import *
+from . import graphs, series, rollups, status_warnings, latest_values, statuses, status_queue, \
+              retention, partitions, wire, token_cache, code_distribution, station_map, fragments, graph_queue
 
 MAX_UNAPPROVED_STATIONS = 30
+FRAGMENT_CACHE_SECONDS = fragments.FRAGMENT_CACHE_SECONDS
 RECENT_MEASUREMENTS_DAYS = 7
 OLD_DATA_DAYS = 365
 CURRENT_VALUES_WINDOW_HOURS = 3
 DISCONNECTED_HOURS = 48
 NOT_CONNECTING_HOURS = 3
 NOTIFICATION_EMAIL = 'pmg@' + settings.DOMAIN_NAME
+LOAD_CHUNK_SIZE = 10000
+SERIES_DEFAULT_POINTS = 1000
+SERIES_MAX_POINTS = 10000
+STATUS_UPDATE_BATCH_SIZE = 500
+MAX_BATCH_READINGS = 10000
+BATCH_INSERT_CHUNK_SIZE = 1000
+OVERVIEW_PAGE_SIZE = 48
+OVERVIEW_SORTS = {
+    'severity' : [ '-status__severity', 'id' ],
+    'last_updated' : [ '-last_updated', '-id' ],
+}
+OVERVIEW_FIELDS = [ 'id', 'name', 'latitude', 'longitude', 'elevation', 'last_updated', 'status__name', 'status__color', 'status__severity' ]
 
 def get_current_list():
     return Station.objects.filter(approved=True)
 
+def encode_overview_cursor(sort, station):
+    if sort == 'severity':
+        value = str(station.status.severity)
+    else:
+        value = station.last_updated.isoformat()
+    return '{}|{}'.format(value, station.id)
+
+def get_overview_after_filter(sort, cursor):
+    try:
+        value, station_id = cursor.split('|')
+        station_id = int(station_id)
+        if sort == 'severity':
+            severity = int(value)
+            return Q(status__severity__lt=severity) | Q(status__severity=severity, id__gt=station_id)
+        last_updated = parse_datetime(value)
+        if last_updated == None:
+            return None
+        return Q(last_updated__lt=last_updated) | Q(last_updated=last_updated, id__lt=station_id)
+    except ValueError:
+        return None
+
+def get_overview_page(sort, cursor=None, search='', status_name='', page_size=OVERVIEW_PAGE_SIZE):
+    station_list = get_current_list().select_related('status').only(*OVERVIEW_FIELDS)
+    if search != '':
+        station_list = station_list.filter(name__icontains=search)
+    if status_name != '':
+        station_list = station_list.filter(status__name=status_name)
+    if cursor != None:
+        after_filter = get_overview_after_filter(sort, cursor)
+        if after_filter != None:
+            station_list = station_list.filter(after_filter)
+
+    page = list(station_list.order_by(*OVERVIEW_SORTS[sort])[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_overview_cursor(sort, page[-1])
+    return page, next_cursor
+
 def get_status(station):
     return station.status.name, station.status.color
 
+def get_statuses():
+    return statuses.get_statuses()
+
 def get_unapproved():
     return Station.objects.filter(approved=False)
 
 def get_by_security_token(security_token):
-    return get_object_or_404(Station, security_token=security_token)
+    station = token_cache.get_station(security_token)
+    if station == None:
+        raise Http404('No station matches the given security token.')
+    return station
 
 def get_by_id(id):
     return get_object_or_404(Station, id=id)
 
 def get_errors(station):
     errors = []
-    for component_object in Component.objects.filter(station=station.id):
-        for error_object in Error.objects.filter(component=component_object.id):
-            errors.append({
-                'id' : error_object.id,
-                'component' : component_object.name,
-                'message' : error_object.message,
-                'datetime' : error_object.datetime
-            })
+    for error_object in Error.objects.filter(component__station=station.id).select_related('component').order_by('component', 'id'):
+        errors.append({
+            'id' : error_object.id,
+            'component' : error_object.component.name,
+            'message' : error_object.message,
+            'datetime' : error_object.datetime
+        })
     return errors
 
 def get_maintainers(station):
     return station.maintainers.all()
 
-def extract_num_unit(string_value):
-    string_value = str(string_value)
-    num = float('NaN')
-    cutout = len(string_value)
-    for i in range(1, len(string_value) + 1):
-        try:
-            num = float(string_value[:i])
-        except ValueError:
-            cutout = i - 1
-            break
-    return num, string_value[cutout:]
+def get_fragment_cache():
+    return fragments.get_cache_alias()
 
-def get_component_data(station):
+def get_component_measurements(component_ids, since):
+    return Measurement.objects.filter(
+    batch__component__in=component_ids,
+    batch__datetime__gt=since,
+    datetime__gt=since).order_by('batch__component', 'batch__datetime', 'batch').values_list(
+        'batch__component', 'batch', 'batch__datetime', 'key', 'value', 'num', 'unit'
+    )
+
+def load_component_batches(component_ids, since):
+    rows = get_component_measurements(component_ids, since).iterator(chunk_size=LOAD_CHUNK_SIZE)
+
+    component_id = None
+    batch_id = None
+    batches = []
+    for row_component_id, row_batch_id, row_datetime, key, value, num, unit in rows:
+        if row_component_id != component_id:
+            if component_id != None:
+                yield component_id, batches
+            component_id = row_component_id
+            batch_id = None
+            batches = []
+        if row_batch_id != batch_id:
+            batch_id = row_batch_id
+            batches.append({ 'id' : batch_id, 'datetime' : localtime(row_datetime), 'measurements' : [] })
+        batches[-1]['measurements'].append({ 'key' : key, 'value' : value, 'num' : num, 'unit' : sys.intern(unit) })
+    if component_id != None:
+        yield component_id, batches
+
+def get_component_series(station, component_ids=None):
     with transaction.atomic():
         component_data = []
 
-        for component_object in Component.objects.filter(station=station.id):
+        window_start = graphs.get_window_start(timezone.now() - timedelta(days=RECENT_MEASUREMENTS_DAYS))
+        component_objects = Component.objects.filter(station=station.id)
+        if component_ids != None:
+            component_objects = component_objects.filter(id__in=component_ids)
+        component_objects = list(component_objects.order_by('id'))
+        component_batches = load_component_batches(
+            [component_object.id for component_object in component_objects],
+            window_start
+        )
+        next_component_batches = next(component_batches, None)
+
+        current_values = {}
+        for latest_value in latest_values.get_latest_values(
+        station, timezone.now() - timedelta(hours=CURRENT_VALUES_WINDOW_HOURS)):
+            if latest_value.num == None:
+                current_value = latest_value.value
+            else:
+                current_value = "{:8.2f}".format(latest_value.num) + latest_value.unit
+            current_values.setdefault(latest_value.component_id, {})[latest_value.key] = current_value
+
+        for component_object in component_objects:
             component = {}
 
+            component['id'] = component_object.id
             component['name'] = component_object.name
 
             batches = []
-            for measurement_batch_object in MeasurementBatch.objects.filter(
-            component=component_object.id,
-            datetime__gt=(timezone.now() - timedelta(days=RECENT_MEASUREMENTS_DAYS))).order_by('datetime'):
-                batch = { 'datetime' : localtime(measurement_batch_object.datetime), 'measurements' : [] }
-                for measurement_object in Measurement.objects.filter(batch=measurement_batch_object.id):
-                    batch['measurements'].append({ 'key' : measurement_object.key, 'value' : measurement_object.value })
-                batches.append(batch)
+            if next_component_batches != None and next_component_batches[0] == component_object.id:
+                batches = next_component_batches[1]
+                next_component_batches = next(component_batches, None)
 
-            timedeltas = []
-            for i in range(1, len(batches)):
-                timedeltas.append(batches[i    ]['datetime'] -
-                                  batches[i - 1]['datetime'])
-            timedeltas = sorted(timedeltas)
-            if len(timedeltas) == 0:
-                median_timedelta = timedelta(0)
-            else:
-                median_timedelta = timedeltas[len(timedeltas) // 2]
-            current_datetime = localtime(timezone.now())
+            median_interval = series.get_median_interval([batch['datetime'] for batch in batches])
 
-            current_values_data = {}
-            graphs_data = {}
+            current_values_data = current_values.get(component_object.id, {})
+            points = {}
             for batch in batches:
-                recent_batch = (current_datetime - batch['datetime']).total_seconds() // 3600 < CURRENT_VALUES_WINDOW_HOURS
-
                 for measurement in batch['measurements']:
                     key = measurement['key']
                     value = measurement['value']
-                    if recent_batch:
-                        num, unit = extract_num_unit(value)
-                        if math.isnan(num):
-                            current_values_data[key] = value
-                        else:
-                            current_values_data[key] = "{:8.2f}".format(num) + unit
-
-                    if key in graphs_data:
-                        data = graphs_data[key]
-                        previous_datetime = data['values'][-1]['x'][-1]
-                        current_datetime = batch['datetime']
-                        if (current_datetime - previous_datetime) > 2.5 * median_timedelta:
-                            data['values'].append({ 'x' : [], 'y' : [] })
-                    else:
-                        data = { 'values' : [ { 'x' : [], 'y' : [] } ], 'constant' : True }
-                        graphs_data[key] = data
-
-                    data['values'][-1]['x'].append(batch['datetime'])
-                    if 'classes' in data:
-                        if not (value in data['classes']):
-                            data['class_ids'].append(data['class_ids'][-1] + 1)
-                            data['classes'].append(value)
-                        data['values'][-1]['y'].append(data['class_ids'][data['classes'].index(value)])
-                        if len(data['values'][-1]['y']) >= 2 and \
-                        (data['values'][-1]['y'][-1] != data['values'][-1]['y'][-2]):
-                            data['constant'] = False
-                    else:
-                        if 'unit' in data:
-                            previous_unit = data['unit']
-                        else:
-                            previous_unit = None
-                        num, unit = extract_num_unit(value)
-                        num = round(num, 2)
-                        if (previous_unit != None and unit != previous_unit) or math.isnan(num):
-                            data['class_ids'] = []
-                            data['classes'] = []
-                            for i in range(len(data['values'])):
-                                for j in range(len(data['values'][i]['y'])):
-                                    y = str(data['values'][i]['y'][j]) + data['unit']
-                                    if not (y in data['classes']):
-                                        new_id = data['class_ids'][-1] + 1 if len(data['class_ids']) > 0 else 1
-                                        data['class_ids'].append(new_id)
-                                        data['classes'].append(y)
-                                    data['values'][i]['y'][j] = data['class_ids'][data['classes'].index(y)]
-                            if not (value in data['classes']):
-                                new_id = data['class_ids'][-1] + 1 if len(data['class_ids']) > 0 else 1
-                                data['class_ids'].append(new_id)
-                                data['classes'].append(value)
-                            data['values'][-1]['y'].append(data['class_ids'][data['classes'].index(value)])
-                            if 'unit' in data: del data['unit']
-                            if len(data['values'][-1]['y']) >= 2 and \
-                            (data['values'][-1]['y'][-1] != data['values'][-1]['y'][-2]):
-                                data['constant'] = False
-                        else:
-                            data['values'][-1]['y'].append(num)
-                            data['unit'] = unit
-                            if len(data['values'][-1]['y']) >= 2 and \
-                            (data['values'][-1]['y'][-1] != data['values'][-1]['y'][-2]):
-                                data['constant'] = False
+                    num = measurement['num']
+                    unit = measurement['unit']
+                    if not key in points:
+                        points[key] = []
+                    points[key].append((batch['datetime'], value, num, unit))
+
+            graphs_data = {}
+            for key in points:
+                graphs_data[key] = series.build_series(points[key], median_interval)
 
             constant_keys = []
             for key in graphs_data:
@@ -182,37 +208,103 @@ def get_component_data(station):
 
             for key in constant_keys:
                 del graphs_data[key]
-                current_values_data[key] += " (constant)"
+                if key in current_values_data:
+                    current_values_data[key] += " (constant)"
 
             component['current_values'] = list(current_values_data.items())
 
-            graphs = []
+            if len(batches) > 0:
+                last_batch_id = max(batch['id'] for batch in batches)
+            else:
+                last_batch_id = None
+            component['graphs_data'] = graphs_data
+            component['graphs'] = []
+            component['latest_graphs'] = []
             for key in graphs_data:
-                graph = (station.security_token + component['name'] + key).replace(' ', '_') + '.png'
-                data = graphs_data[key]
-                color = [ random.uniform(0, 1), random.uniform(0, 1), random.uniform(0, 1) ]
-                plt.figure(figsize=(12, 5))
-                if 'classes' in data:
-                    plt.yticks(data['class_ids'], data['classes'], size='x-large')
-                else:
-                    ax = plt.gca()
-                    ax.yaxis.set_major_formatter(mticker.ScalarFormatter())
-                    ax.yaxis.get_major_formatter().set_useOffset(False)
-                if 'unit' in data: plt.ylabel(data['unit'], rotation='horizontal', size='x-large', labelpad=25)
-                plt.title(key, size='xx-large')
-                plt.tick_params(axis='x', which='major', labelsize='large')
-                plt.tick_params(axis='y', which='major', labelsize='x-large')
-                for xy in data['values']:
-                    plt.plot(xy['x'], xy['y'], color=color)
-                plt.savefig(path.join('/tmp', graph))
-                plt.close()
-                graphs.append(graph)
-            component['graphs'] = graphs
+                component['graphs'].append(graphs.get_graph_name(
+                    station.id, component['name'], key, last_batch_id, window_start
+                ))
+                component['latest_graphs'].append(graphs.get_latest_graph_name(station.id, component['name'], key))
 
             component_data.append(component)
 
         return component_data
 
+def get_graph_jobs(component_data):
+    graph_jobs = []
+    for component in component_data:
+        for graph, latest_graph, key in zip(component['graphs'], component['latest_graphs'], component['graphs_data']):
+            if not graphs.graph_exists(graph):
+                color = graphs.get_graph_color(component['name'], key)
+                graph_jobs.append((graph, latest_graph, key, component['graphs_data'][key], color))
+    return graph_jobs
+
+def get_component_data(station):
+    component_data = get_component_series(station)
+    stale_component_ids = []
+    for component in component_data:
+        finished_graphs = []
+        for graph, latest_graph in zip(component['graphs'], component['latest_graphs']):
+            if not graphs.graph_exists(graph):
+                if not component['id'] in stale_component_ids:
+                    stale_component_ids.append(component['id'])
+                graph = graphs.get_latest_graph(latest_graph)
+            if graph != None:
+                finished_graphs.append(graph)
+        component['graphs'] = finished_graphs
+    graph_queue.mark_dirty(stale_component_ids)
+    return component_data
+
+def get_series_measurements(station, component_name, key, start, end):
+    return Measurement.objects.filter(
+    batch__component__station=station.id,
+    batch__component__name=component_name,
+    key=key,
+    batch__datetime__gte=start,
+    batch__datetime__lte=end,
+    datetime__gte=start,
+    datetime__lte=end).order_by('batch__datetime', 'batch').values_list(
+        'batch__datetime', 'value', 'num', 'unit'
+    )
+
+def get_series_resolution(start, end, point_budget):
+    span = (end - start).total_seconds()
+    for resolution in reversed(rollups.ROLLUP_RESOLUTIONS):
+        retention_days = rollups.ROLLUP_RETENTION_DAYS[resolution]
+        if retention_days != None and start < timezone.now() - timedelta(days=retention_days):
+            continue
+        if span / resolution >= point_budget:
+            return resolution
+    return None
+
+def get_series_points(station, component_name, key, start, end, resolution):
+    if resolution != None:
+        points = rollups.get_rollup_points(station, component_name, key, resolution, start, end)
+        if len(points) > 0 and not series.is_categorical(points):
+            return points, resolution
+    with transaction.atomic():
+        rows = get_series_measurements(station, component_name, key, start, end).iterator(chunk_size=LOAD_CHUNK_SIZE)
+        return list(rows), None
+
+def get_series(station, component_name, key, start, end, point_budget):
+    point_budget = min(max(point_budget, 2), SERIES_MAX_POINTS)
+    points, resolution = get_series_points(station, component_name, key, start, end, get_series_resolution(start, end, point_budget))
+
+    data = series.build_series(points, series.get_median_interval([point[0] for point in points]))
+    timestamps, values, segments = series.downsample(data, point_budget)
+    return {
+        'component' : component_name,
+        'key' : key,
+        'resolution' : resolution,
+        'timestamps' : timestamps,
+        'values' : values,
+        'segments' : segments,
+        'unit' : data['unit'] if 'unit' in data else None,
+        'class_ids' : data['class_ids'] if 'classes' in data else None,
+        'classes' : data['classes'] if 'classes' in data else None,
+        'constant' : data['constant'],
+    }
+
 def register(data):
     if Station.objects.filter(approved=False).count() >= MAX_UNAPPROVED_STATIONS:
         return ''
@@ -237,17 +329,16 @@ def register(data):
     return security_token
 
 def registration_resolve(security_token, approve):
-    try:
-        station = Station.objects.get(security_token=security_token)
-        if approve:
-            station.approved = approve
-            station.save()
-        else:
-            station.delete()
-        return True
-    except Station.DoesNotExit:
-        pass
-    return False
+    station = token_cache.get_station(security_token)
+    if station == None:
+        return False
+    if approve:
+        station.approved = approve
+        station.save(update_fields=['approved'])
+        station_map.invalidate()
+    else:
+        station.delete()
+    return True
 
 def notify_maintainers(station, warnings_issued):
     emails = []
@@ -273,321 +364,418 @@ def notify_maintainers(station, warnings_issued):
     )
     '''
 
-def check_warning(station, warning):
-    expression = warning.expression
-    expression_prepared = list(expression)
-    variable_regex = re.compile('\$\{([^}]*)\.([^}]*)\}')
-    offset = 0
-    for match in variable_regex.finditer(expression):
-        component_regex = re.compile('^' + match.group(1).lower().replace(' ', '_').replace('*', '.*') + '$')
-        member_regex = re.compile('^' + match.group(2).lower().replace(' ', '_').replace('*', '.*') + '$')
-
-        value = None
-        for component in Component.objects.filter(station=station.id):
-            if component_regex.fullmatch(component.name.lower().replace(' ', '_')) != None:
-                for measurement_batch in MeasurementBatch.objects.filter(
-                component=component.id,
-                datetime__gt=(timezone.now() - timedelta(days=RECENT_MEASUREMENTS_DAYS))).order_by('datetime').reverse():
-                    for measurement in Measurement.objects.filter(batch=measurement_batch.id):
-                        if member_regex.fullmatch(measurement.key.lower().replace(' ', '_')) != None:
-                            num, unit = extract_num_unit(measurement.value)
-                            if math.isnan(num):
-                                value = '\'' + unit + '\''
-                            else:
-                                value = num
-                            break
-        if value == None:
-            return True
-
-        expression_prepared[match.start() - offset : match.end() - offset] = str(value)
-        offset += match.end() - match.start() - len(str(value))
-    expression_prepared = ''.join(expression_prepared)
-
-    return eval(expression_prepared)
-
 def get_warnings_issued(station):
-    warnings_issued = []
-    for warning in StatusWarning.objects.all():
-        if check_warning(station, warning):
-            warnings_issued.append(warning)
-    return warnings_issued
-
-def update_status(station):
-    previous_status = station.status
-    warnings_issued = []
-    if (timezone.now() - station.last_updated).total_seconds() // 3600 > DISCONNECTED_HOURS:
-        status = Status.objects.get(name="Disconnected")
-    elif len(get_errors(station)) > 0:
-        status = Status.objects.get(name="Error(s) occured")
+    since = timezone.now() - timedelta(days=RECENT_MEASUREMENTS_DAYS)
+    snapshot = status_warnings.Snapshot(status_warnings.get_latest_values(station, since))
+    return status_warnings.get_warnings_issued(StatusWarning.objects.all(), snapshot)
+
+def get_hours_since(moment, now):
+    return (now - moment).total_seconds() // 3600
+
+def is_disconnected(station, now):
+    return get_hours_since(station.last_updated, now) > DISCONNECTED_HOURS
+
+def choose_status(station, has_errors, warnings_issued, now):
+    if is_disconnected(station, now):
+        return statuses.get_status_by_name("Disconnected")
+    elif has_errors:
+        return statuses.get_status_by_name("Error(s) occured")
+    elif len(warnings_issued) > 0:
+        return statuses.get_status_by_name("Warning(s) issued")
+    elif get_hours_since(station.last_updated, now) > NOT_CONNECTING_HOURS:
+        return statuses.get_status_by_name("Not connecting")
     else:
-        warnings_issued = get_warnings_issued(station)
+        return statuses.get_default_status()
 
-        if len(warnings_issued) > 0:
-            status = Status.objects.get(name="Warning(s) issued")
-        elif (timezone.now() - station.last_updated).total_seconds() // 3600 > NOT_CONNECTING_HOURS:
-            status = Status.objects.get(name="Not connecting")
-        else:
-            status = Status.objects.all().first()
+def set_status(station, status, warnings_issued):
+    if station.status_id == status.id:
+        return False
+    previous_status = statuses.get_status_by_id(station.status_id)
     station.status = status
 
     if station.status.severity > previous_status.severity:
         notify_maintainers(station, warnings_issued)
+    return True
 
-    station.save()
+def update_status(station):
+    now = timezone.now()
+    has_errors = Error.objects.filter(component__station=station.id).exists()
+    warnings_issued = []
+    if not is_disconnected(station, now) and not has_errors:
+        warnings_issued = get_warnings_issued(station)
 
-def update_statuses():
-    for station in Station.objects.filter(approved=True):
-        update_status(station)
+    if set_status(station, choose_status(station, has_errors, warnings_issued, now), warnings_issued):
+        station.save(update_fields=['status'])
+
+def update_statuses(station_ids=None):
+    now = timezone.now()
+    station_objects = Station.objects.filter(approved=True)
+    if station_ids != None:
+        station_objects = station_objects.filter(id__in=station_ids)
+    station_list = list(station_objects.annotate(
+        has_errors=Exists(Error.objects.filter(component__station=OuterRef('pk')))
+    ).only('id', 'name', 'last_updated', 'status'))
+    fleet_latest_values = status_warnings.get_fleet_latest_values(now - timedelta(days=RECENT_MEASUREMENTS_DAYS), station_ids)
+    warnings = list(StatusWarning.objects.all())
+
+    changed_stations = []
+    for station in station_list:
+        warnings_issued = []
+        if not is_disconnected(station, now) and not station.has_errors:
+            snapshot = status_warnings.Snapshot(fleet_latest_values.get(station.id, {}))
+            warnings_issued = status_warnings.get_warnings_issued(warnings, snapshot)
+
+        if set_status(station, choose_status(station, station.has_errors, warnings_issued, now), warnings_issued):
+            changed_stations.append(station)
+    Station.objects.bulk_update(changed_stations, ['status'], batch_size=STATUS_UPDATE_BATCH_SIZE)
+
+def process_dirty_stations():
+    with transaction.atomic():
+        dirty = status_queue.take_dirty_stations()
+        if len(dirty) == 0:
+            return 0
+        update_statuses([ station_id for station_id, _ in dirty ])
+    status_queue.record_lag([ marked for _, marked in dirty ])
+    return len(dirty)
+
+def delete_old_data(stopped=None):
+    cutoff = timezone.now() - timedelta(days=OLD_DATA_DAYS)
+    if partitions.is_partitioned():
+        partitions.create_partitions_ahead()
+        partitions.drop_old_partitions(cutoff)
+    retention.delete_old_batches(cutoff, stopped=stopped)
+    retention.delete_orphan_persons()
+    rollups.delete_old_rollups()
+
+def get_maintainers_fingerprint(maintainers_data):
+    return hashlib.sha256(json.dumps(maintainers_data, sort_keys=True).encode()).hexdigest()
+
+def save_batches(batches):
+    if connection.features.can_return_ids_from_bulk_insert:
+        MeasurementBatch.objects.bulk_create(batches)
+    else:
+        for batch in batches:
+            batch.save()
+
+def insert_batches_on_conflict(batches):
+    inserted_ids = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(batches), BATCH_INSERT_CHUNK_SIZE):
+            chunk = batches[start:start + BATCH_INSERT_CHUNK_SIZE]
+            params = []
+            for batch in chunk:
+                params += [ batch.datetime, batch.component_id ]
+            cursor.execute(
+                'INSERT INTO {table} ({datetime}, {component}) VALUES {values} '
+                'ON CONFLICT ({component}, {datetime}) DO NOTHING RETURNING {id}, {component}, {datetime}'.format(
+                    table=connection.ops.quote_name(MeasurementBatch._meta.db_table),
+                    datetime=connection.ops.quote_name(MeasurementBatch._meta.get_field('datetime').column),
+                    component=connection.ops.quote_name(MeasurementBatch._meta.get_field('component').column),
+                    id=connection.ops.quote_name(MeasurementBatch._meta.pk.column),
+                    values=', '.join(['(%s, %s)'] * len(chunk))
+                ), params)
+            for batch_id, component_id, batch_datetime in cursor.fetchall():
+                inserted_ids[(component_id, batch_datetime)] = batch_id
+
+    inserted_batches = []
+    for batch in batches:
+        batch_id = inserted_ids.get((batch.component_id, batch.datetime))
+        if batch_id != None:
+            batch.id = batch_id
+            batch._state.adding = False
+            inserted_batches.append(batch)
+    return inserted_batches
+
+def get_existing_batch_keys(batches):
+    return set(MeasurementBatch.objects.filter(
+        component__in=set([ batch.component_id for batch in batches ]),
+        datetime__gte=min([ batch.datetime for batch in batches ]),
+        datetime__lte=max([ batch.datetime for batch in batches ])
+    ).values_list('component', 'datetime'))
+
+def insert_batches(batches):
+    unique_batches = {}
+    for batch in batches:
+        unique_batches.setdefault((batch.component_id, batch.datetime), batch)
+    batches = list(unique_batches.values())
+    if len(batches) == 0:
+        return []
+
+    if connection.vendor == 'postgresql':
+        return insert_batches_on_conflict(batches)
+    existing_keys = get_existing_batch_keys(batches)
+    batches = [ batch for batch in batches if not (batch.component_id, batch.datetime) in existing_keys ]
+    save_batches(batches)
+    return batches
+
+def get_reading_datetime(reading):
+    return make_aware(datetime.fromtimestamp(int(reading['timestamp'])))
+
+def validate_reading(station, reading):
+    error = wire.validate_reading(reading)
+    if error != None:
+        return error
+    if 'security_token' in reading and reading['security_token'] != station.security_token:
+        return 'security token mismatch'
+    if 'timestamp' in reading:
+        try:
+            get_reading_datetime(reading)
+        except (ValueError, OverflowError, OSError):
+            return 'invalid timestamp'
+    return None
+
+def save_errors(station, readings, components):
+    errors = []
+    results = []
+    for reading in readings:
+        component = components.get(reading['component'])
+        if component == None:
+            results.append('unknown component')
+            continue
+        error = Error()
+        error.component = component
+        error.message = reading['error']
+        if 'timestamp' in reading:
+            error.datetime = get_reading_datetime(reading)
+        else:
+            error.datetime = timezone.now()
+        errors.append(error)
+        results.append(None)
+    Error.objects.bulk_create(errors)
+    return results
+
+def is_current_reading(station, reading):
+    return not 'timestamp' in reading or get_reading_datetime(reading) >= station.last_updated
+
+def update_station_attributes(station, reading):
+    field_names = set([ field.attname for field in Station._meta.concrete_fields ])
+    update_fields = set()
+    for key in reading:
+        if type(reading[key]) is list or type(reading[key]) is dict:
+            continue
+        elif hasattr(station, key):
+            try:
+                value = reading[key]
+                value = type(getattr(station, key))(value)
+                setattr(station, key, value)
+                if key in field_names: update_fields.add(key)
+            except ValueError:
+                pass
+    if 'timestamp' in reading:
+        station.last_updated = get_reading_datetime(reading)
+        update_fields.add('last_updated')
+    return update_fields
+
+def update_maintainers(station, maintainers_data):
+    fingerprint = get_maintainers_fingerprint(maintainers_data)
+    if fingerprint == station.maintainers_fingerprint:
+        return False
+    persons = set([ normalize_person(
+        maintainer_data.get('name', Person._meta.get_field('name').default),
+        maintainer_data.get('phone', Person._meta.get_field('phone').default),
+        maintainer_data.get('email', Person._meta.get_field('email').default)
+    ) for maintainer_data in maintainers_data ])
+
+    maintainers = []
+    for name, phone, email in sorted(persons):
+        maintainer, _ = Person.objects.select_for_update().get_or_create(name=name, phone=phone, email=email)
+        maintainers.append(maintainer)
+    station.maintainers.set(maintainers)
+    station.maintainers_fingerprint = fingerprint
+    return True
+
+def get_components(station, readings):
+    components = {}
+    for component in Component.objects.filter(station=station.id):
+        components[component.name] = component
+    for reading in readings:
+        for component_data in reading.get('components', []):
+            if not 'name' in component_data or component_data['name'] in components: continue
+
+            component = Component()
+            component.name = component_data['name']
+            component.station = station
+            component.old = False
+            component.save()
+            components[component.name] = component
+    return components
+
+def save_readings(station, readings, components):
+    readings = sorted(readings, key=lambda reading: int(reading.get('timestamp', 0)))
+    current_readings = [ reading for reading in readings if is_current_reading(station, reading) ]
+    map_fields = (station.name, station.latitude, station.longitude)
+    update_fields = set([ 'revision' ])
+    for reading in current_readings:
+        update_fields |= update_station_attributes(station, reading)
+    if (station.name, station.latitude, station.longitude) != map_fields:
+        station_map.invalidate()
+
+    batches = []
+    batch_measurements = {}
+    for reading in readings:
+        present_components = set()
+        for component_data in reading.get('components', []):
+            if not 'name' in component_data: continue
+
+            target_component = components[component_data['name']]
+            present_components.add(target_component.name)
+
+            if 'timestamp' in reading and 'measurements' in component_data:
+                batch = MeasurementBatch()
+                batch.datetime = get_reading_datetime(reading)
+                batch.component = target_component
+                batches.append(batch)
+                batch_measurements.setdefault((target_component.id, batch.datetime), component_data['measurements'])
+
+    batches = insert_batches(batches)
+    measurements = []
+    samples = []
+    value_samples = []
+    for batch in batches:
+        measurements_data = batch_measurements[(batch.component_id, batch.datetime)]
+        for key in measurements_data:
+            measurement = Measurement()
+            measurement.key = key
+            measurement.value = measurements_data[key]
+            measurement.num, measurement.unit = series.parse_value(measurement.value)
+            measurement.batch = batch
+            measurement.datetime = batch.datetime
+            measurements.append(measurement)
+            value_samples.append((batch.component_id, key, batch.datetime, measurement.value, measurement.num, measurement.unit))
+            samples.append((batch.component_id, key, batch.datetime, measurement.num, measurement.unit))
+    Measurement.objects.bulk_create(measurements)
+    graph_queue.mark_dirty([ batch.component_id for batch in batches ])
+    rollups.update_rollups(samples)
+    latest_values.update_latest_values(value_samples)
+
+    if len(current_readings) > 0 and current_readings[-1] is readings[-1]:
+        old_ids = []
+        current_ids = []
+        for component in components.values():
+            old = not component.name in present_components
+            if component.old != old:
+                if old:
+                    old_ids.append(component.id)
+                else:
+                    current_ids.append(component.id)
+        if len(old_ids) > 0:
+            Component.objects.filter(id__in=old_ids).update(old=True)
+        if len(current_ids) > 0:
+            Component.objects.filter(id__in=current_ids).update(old=False)
+
+        newest_reading = readings[-1]
+        if update_maintainers(station, newest_reading['maintainers'] if 'maintainers' in newest_reading else []):
+            update_fields.add('maintainers_fingerprint')
+
+    station.revision = fragments.get_revision_update()
+    station.save(update_fields=sorted(update_fields))
+
+def ingest_readings(station, readings):
+    results = [ validate_reading(station, reading) for reading in readings ]
+    if station.approved:
+        error_indices = [ i for i, reading in enumerate(readings) if results[i] == None and 'error' in reading ]
+        data_indices = [ i for i, reading in enumerate(readings) if results[i] == None and not 'error' in reading ]
+        if len(error_indices) > 0 or len(data_indices) > 0:
+            with transaction.atomic():
+                station.last_updated = Station.objects.select_for_update().values_list('last_updated', flat=True).get(id=station.id)
+                components = get_components(station, [ readings[i] for i in data_indices ])
+                error_results = save_errors(station, [ readings[i] for i in error_indices ], components)
+                for i, error in zip(error_indices, error_results):
+                    results[i] = error
+                if len(data_indices) > 0:
+                    save_readings(station, [ readings[i] for i in data_indices ], components)
+                else:
+                    fragments.bump([ station.id ])
 
-def delete_old_data():
-    for measurement_batch in MeasurementBatch.objects.filter(
-    datetime__lt=(timezone.now() - timedelta(days=OLD_DATA_DAYS))):
-        measurement_batch.delete()
+            status_queue.mark_dirty(station)
+            if status_queue.is_stale():
+                update_status(station)
+    return results
 
 def new_data(data):
-    try:
-        station = Station.objects.get(security_token=data['security_token'])
-        if not station.approved:
-            return True
-    except Exception:
+    security_token = data.get('security_token') if type(data) is dict else None
+    entry = token_cache.lookup(security_token)
+    if entry == None:
         return False
-
-    if 'error' in data:
-        if 'component' in data:
-            error = Error()
-            for component in Component.objects.filter(station=station.id):
-                if component.name == data['component']:
-                    error.component = component
-                    break
-            error.message = data['error']
-            if 'timestamp' in data:
-                error.datetime = make_aware(datetime.fromtimestamp(int(data['timestamp'])))
-            else:
-                error.datetime = timezone.now()
-            error.save()
-        else:
-            return False
+    if not entry[1]:
+        return True
+    station = token_cache.get_station(security_token)
+    if station == None:
+        return False
+    if not station.approved:
+        return True
+    return ingest_readings(station, [ data ])[0] == None
+
+def new_data_batch(security_token, readings):
+    entry = token_cache.lookup(security_token)
+    if entry == None:
+        return None
+    if not entry[1]:
+        results = [ None ] * len(readings[:MAX_BATCH_READINGS])
     else:
-        with transaction.atomic():
-            for key in data:
-                if type(data[key]) is list or type(data[key]) is dict:
-                    continue
-                elif hasattr(station, key):
-                    try:
-                        value = data[key]
-                        value = type(getattr(station, key))(value)
-                        setattr(station, key, value)
-                    except ValueError:
-                        pass
-            if 'timestamp' in data: station.last_updated = make_aware(datetime.fromtimestamp(int(data['timestamp'])))
-
-            components = Component.objects.filter(station=station.id)
-            for component in components:
-                component.old = True
-
-            if 'components' in data:
-                for component_data in data['components']:
-                    if not 'name' in component_data: continue
-
-                    target_component = None
-                    for component in components:
-                        if component.name == component_data['name']:
-                            target_component = component
-                            break
-                    if target_component == None:
-                        target_component = Component()
-                        target_component.name = component_data['name']
-                        target_component.station = station
-                        target_component.old = False
-                        target_component.save()
-
-                    if 'timestamp' in data and 'measurements' in component_data:
-                        batch = MeasurementBatch()
-                        batch.datetime = make_aware(datetime.fromtimestamp(int(data['timestamp'])))
-                        batch.component = target_component
-                        batch.save()
-                        for key in component_data['measurements']:
-                            measurement = Measurement()
-                            measurement.key = key
-                            measurement.value = component_data['measurements'][key]
-                            measurement.batch = batch
-                            measurement.save()
-
-            for component in components:
-                component.save()
-
-            with transaction.atomic():
-                connection.cursor().execute('LOCK {}'.format(Person._meta.db_table))
-
-                existing_maintainers = station.maintainers.all()
-                found_maintainers = []
-                new_maintainers_data = []
-                if 'maintainers' in data:
-                    for maintainer_data in data['maintainers']:
-                        maintainer = None
-                        for existing_maintainer in existing_maintainers:
-                            same = True
-                            for key in maintainer_data:
-                                try:
-                                    if hasattr(existing_maintainer, key):
-                                        if getattr(existing_maintainer, key) != type(getattr(existing_maintainer, key))(maintainer_data[key]):
-                                            same = False
-                                            break
-                                    else:
-                                        same = False
-                                        break
-                                except ValueError:
-                                    same = False
-                                    break
-                            if same:
-                               maintainer = existing_maintainer
-                               break
-                        if maintainer != None:
-                            found_maintainers.append(maintainer)
-                        else:
-                            new_maintainers_data.append(maintainer_data)
-                for maintainer in existing_maintainers:
-                    if not maintainer in found_maintainers:
-                        station.maintainers.remove(maintainer)
-                        if maintainer.station_set.all().count() == 0:
-                            maintainer.delete()
-
-                persons = Person.objects.all()
-                for new_maintainer_data in new_maintainers_data:
-                    found = False
-                    for person in persons:
-                        same = True
-                        for key in new_maintainer_data:
-                            try:
-                                if hasattr(person, key):
-                                    if getattr(person, key) != type(getattr(person, key))(new_maintainer_data[key]):
-                                        same = False
-                                        break
-                                else:
-                                    same = False
-                                    break
-                            except ValueError:
-                                same = False
-                                break
-                        if same:
-                            station.maintainers.add(person)
-                            found = True
-                            break
-                    if not found:
-                        maintainer = Person()
-                        for key in new_maintainer_data:
-                            if hasattr(maintainer, key):
-                                try:
-                                    value = new_maintainer_data[key]
-                                    value = type(getattr(maintainer, key))(value)
-                                    setattr(maintainer, key, value)
-                                except ValueError:
-                                    pass
-                        maintainer.save()
-                        station.maintainers.add(maintainer)
-
-            station.save()
-
-    update_status(station)
-    return True
+        station = token_cache.get_station(security_token)
+        if station == None:
+            return None
+        if station.approved:
+            results = ingest_readings(station, readings[:MAX_BATCH_READINGS])
+        else:
+            results = [ None ] * len(readings[:MAX_BATCH_READINGS])
+    results += [ 'too many readings' ] * len(readings[MAX_BATCH_READINGS:])
+    acks = []
+    for i, error in enumerate(results):
+        if error == None:
+            acks.append({ 'index' : i, 'ok' : True })
+        else:
+            acks.append({ 'index' : i, 'ok' : False, 'error' : error })
+    return acks
 
 def get_version():
-    from .station_code.internals import config
-    return config.VERSION
+    return code_distribution.get_version()
 
 def get_code_filepath():
-    return path.join(path.dirname(__file__), 'station_code.zip')
+    return code_distribution.get_code_filepath()
 
 def error_resolve(id):
     try:
-        Error.objects.get(id=id).delete()
+        error = Error.objects.select_related('component').get(id=id)
+        error.delete()
+        fragments.bump([ error.component.station_id ])
         return True
     except Exception:
         pass
     return False
 
 def delete(security_token):
-    try:
-        Station.objects.get(security_token=security_token).delete()
-        return True
-    except Exception:
-        pass
-    return False
-
-def get_graph_path(graph):
-    return path.join('/tmp', graph)
+    station = token_cache.get_station(security_token)
+    if station == None:
+        return False
+    station.delete()
+    return True
 
 def warning_delete(id):
     try:
         StatusWarning.objects.get(id=id).delete()
+        fragments.bump()
         return True
     except Exception:
         pass
     return False
 
 def warning_add(expression, message):
-    try:
-        if len(expression) > 256: return False
-        if len(message) > 128: return False
-
-        expression_prepared = list(expression)
-        variable_regex = re.compile('\$\{([^}]*)\.([^}]*)\}')
-        variable_count = 0
-        offset = 0
-        for match in variable_regex.finditer(expression):
-            expression_prepared[match.start() - offset : match.end() - offset] = 'x'
-            variable_count += 1
-            offset += match.end() - match.start() - 1
-        if variable_count == 0: return False
-        expression_prepared = ''.join(expression_prepared)
-
-        tree = ast.parse(expression_prepared)
-        if not isinstance(tree.body[0], ast.Expr) or \
-        (not isinstance(tree.body[0].value, ast.BoolOp) and not isinstance(tree.body[0].value, ast.Compare)):
-            return False
-
-        allowed_nodes = [
-            ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Dict, ast.Set, ast.ListComp,
-            ast.SetComp, ast.DictComp, ast.Compare, ast.Num, ast.Str, ast.NameConstant,
-            ast.Constant, ast.Attribute, ast.Subscript, ast.Starred, ast.Name,
-            ast.List, ast.Tuple, ast.Load, ast.Store, ast.AugLoad,
-            ast.AugStore, ast.And, ast.Or, ast.Add, ast.Sub, ast.Mult, ast.MatMult, ast.Div,
-            ast.Mod, ast.Pow, ast.LShift, ast.RShift, ast.BitOr, ast.BitXor,
-            ast.BitAnd, ast.FloorDiv, ast.Invert, ast.Not, ast.UAdd, ast.USub,
-            ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Is,
-            ast.IsNot, ast.In, ast.NotIn
-        ]
-
-        class AllowedVisitor(ast.NodeVisitor):
-
-            def __init__(self):
-                self.allowed = True
-
-            def generic_visit(self, node):
-                found = False
-                for allowed_node in allowed_nodes:
-                    if isinstance(node, allowed_node):
-                        found = True
-                        break
-                if not found:
-                    self.allowed = False
-                else:
-                    ast.NodeVisitor.generic_visit(self, node)
-
-        allowed_visitor = AllowedVisitor()
-        allowed_visitor.visit(tree.body[0].value)
-        if not allowed_visitor.allowed:
-            return False
-
-    except Exception:
-        return False
+    if len(expression) > 256: return False
+    if len(message) > 128: return False
+    if status_warnings.compile_warning(expression) == None: return False
 
     warning = StatusWarning()
     warning.expression = expression
     warning.message = message
     warning.save()
+    fragments.bump()
 
     return True
 
 def get_warnings():
     return StatusWarning.objects.all()
+
+def get_status_queue_stats():
+    return status_queue.get_queue_stats()
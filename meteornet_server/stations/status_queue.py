@@ -0,0 +1,62 @@
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count, Min
+
+import logging
+import time
+
+from .models import *
+
+STATUS_QUEUE_POLL_SECONDS = 2
+STATUS_QUEUE_BATCH_SIZE = 500
+STATUS_MAX_STALENESS_SECONDS = 60
+STATUS_QUEUE_STATS_SECONDS = 300
+STATUS_STALENESS_CHECK_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+lag_stats = { 'processed' : 0, 'max_lag' : 0.0, 'since' : time.monotonic() }
+staleness = { 'stale' : False, 'checked' : None }
+
+def mark_dirty(station):
+    DirtyStation.objects.bulk_create([ DirtyStation(station=station) ], ignore_conflicts=True)
+
+def get_queue_stats():
+    stats = DirtyStation.objects.aggregate(pending=Count('id'), oldest=Min('marked'))
+    if stats['oldest'] == None:
+        lag = 0.0
+    else:
+        lag = max((timezone.now() - stats['oldest']).total_seconds(), 0.0)
+    return { 'pending' : stats['pending'], 'lag' : lag, 'max_staleness' : STATUS_MAX_STALENESS_SECONDS }
+
+def is_stale():
+    if staleness['checked'] == None or time.monotonic() - staleness['checked'] >= STATUS_STALENESS_CHECK_SECONDS:
+        oldest = DirtyStation.objects.aggregate(Min('marked'))['marked__min']
+        staleness['stale'] = oldest != None and (timezone.now() - oldest).total_seconds() > STATUS_MAX_STALENESS_SECONDS
+        staleness['checked'] = time.monotonic()
+    return staleness['stale']
+
+def take_dirty_stations():
+    with transaction.atomic():
+        dirty = list(DirtyStation.objects.select_for_update(skip_locked=True, of=('self',)).order_by('marked').values_list(
+            'id', 'station', 'marked'
+        )[:STATUS_QUEUE_BATCH_SIZE])
+        if len(dirty) > 0:
+            DirtyStation.objects.filter(id__in=[ row[0] for row in dirty ]).delete()
+    return [ (station_id, marked) for _, station_id, marked in dirty ]
+
+def record_lag(marks):
+    now = timezone.now()
+    for marked in marks:
+        lag_stats['processed'] += 1
+        lag_stats['max_lag'] = max(lag_stats['max_lag'], (now - marked).total_seconds())
+
+    elapsed = time.monotonic() - lag_stats['since']
+    if elapsed >= STATUS_QUEUE_STATS_SECONDS:
+        logger.info(
+            'Status queue: %d stations processed in %.0f s, %.1f s max lag',
+            lag_stats['processed'], elapsed, lag_stats['max_lag']
+        )
+        lag_stats['processed'] = 0
+        lag_stats['max_lag'] = 0.0
+        lag_stats['since'] = time.monotonic()
@@ -0,0 +1,131 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+import ast
+import re
+
+from .models import *
+
+VARIABLE_REGEX = re.compile('\\$\\{([^}]*)\\.([^}]*)\\}')
+ALLOWED_NODE_NAMES = [
+    'Expression', 'BoolOp', 'BinOp', 'UnaryOp', 'Dict', 'Set', 'ListComp',
+    'SetComp', 'DictComp', 'Compare', 'Num', 'Str', 'NameConstant',
+    'Constant', 'Subscript', 'Starred', 'Name',
+    'List', 'Tuple', 'Load', 'Store', 'AugLoad',
+    'AugStore', 'And', 'Or', 'Add', 'Sub', 'Mult', 'MatMult', 'Div',
+    'Mod', 'Pow', 'LShift', 'RShift', 'BitOr', 'BitXor',
+    'BitAnd', 'FloorDiv', 'Invert', 'Not', 'UAdd', 'USub',
+    'Eq', 'NotEq', 'Lt', 'LtE', 'Gt', 'GtE', 'Is',
+    'IsNot', 'In', 'NotIn',
+]
+ALLOWED_NODES = tuple(getattr(ast, name) for name in ALLOWED_NODE_NAMES if hasattr(ast, name))
+
+compiled_warnings = {}
+
+def normalize_name(name):
+    return name.lower().replace(' ', '_')
+
+def get_pattern_regex(pattern):
+    return re.compile('^' + normalize_name(pattern).replace('*', '.*') + '$')
+
+def compile_warning(expression):
+    variables = []
+    names = {}
+    def replace_variable(match):
+        if not match.group(0) in names:
+            names[match.group(0)] = 'v' + str(len(variables))
+            variables.append((match.group(1), match.group(2)))
+        return names[match.group(0)]
+
+    try:
+        prepared = VARIABLE_REGEX.sub(replace_variable, expression)
+        if len(variables) == 0:
+            return None
+        tree = ast.parse(prepared, mode='eval')
+    except (SyntaxError, ValueError):
+        return None
+    if not isinstance(tree.body, ast.BoolOp) and not isinstance(tree.body, ast.Compare):
+        return None
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            return None
+        if isinstance(node, ast.Name) and not node.id in names.values():
+            return None
+
+    code = compile(tree, '<warning>', 'eval')
+    patterns = [ (get_pattern_regex(component), get_pattern_regex(key)) for component, key in variables ]
+    argument_names = [ 'v' + str(i) for i in range(len(variables)) ]
+    def evaluate(values):
+        return eval(code, { '__builtins__' : {} }, dict(zip(argument_names, values)))
+    return { 'patterns' : patterns, 'evaluate' : evaluate }
+
+def get_compiled_warning(warning):
+    cache_key = (warning.id, warning.expression)
+    if not cache_key in compiled_warnings:
+        compiled_warnings[cache_key] = compile_warning(warning.expression)
+    return compiled_warnings[cache_key]
+
+@receiver(post_save, sender=StatusWarning)
+@receiver(post_delete, sender=StatusWarning)
+def invalidate_compiled_warning(sender, instance, **kwargs):
+    for cache_key in [ cache_key for cache_key in compiled_warnings if cache_key[0] == instance.id ]:
+        del compiled_warnings[cache_key]
+
+class Snapshot:
+
+    def __init__(self, latest_values):
+        self.index = {}
+        for (component, key), value in latest_values.items():
+            self.index.setdefault(normalize_name(component), {})[normalize_name(key)] = value
+        self.resolved = {}
+
+    def resolve(self, pattern):
+        if not pattern in self.resolved:
+            component_regex, key_regex = pattern
+            latest = None
+            for component, keys in self.index.items():
+                if component_regex.fullmatch(component) == None:
+                    continue
+                for key, value in keys.items():
+                    if key_regex.fullmatch(key) != None and (latest == None or value[0] > latest[0]):
+                        latest = value
+            self.resolved[pattern] = latest[1] if latest != None else None
+        return self.resolved[pattern]
+
+def get_latest_values(station, since):
+    latest_values = {}
+    for component, key, value_datetime, value, num in LatestValue.objects.filter(
+    component__station=station.id, datetime__gt=since).values_list('component__name', 'key', 'datetime', 'value', 'num'):
+        latest_values[(component, key)] = (value_datetime, value if num == None else num)
+    return latest_values
+
+def get_fleet_latest_values(since, station_ids=None):
+    latest_value_objects = LatestValue.objects.filter(component__station__approved=True, datetime__gt=since)
+    if station_ids != None:
+        latest_value_objects = latest_value_objects.filter(component__station__in=station_ids)
+
+    fleet_latest_values = {}
+    for station_id, component, key, value_datetime, value, num in latest_value_objects.values_list(
+        'component__station', 'component__name', 'key', 'datetime', 'value', 'num'
+    ).iterator():
+        fleet_latest_values.setdefault(station_id, {})[(component, key)] = (value_datetime, value if num == None else num)
+    return fleet_latest_values
+
+def is_warning_issued(warning, snapshot):
+    compiled = get_compiled_warning(warning)
+    if compiled == None:
+        return False
+
+    values = []
+    for pattern in compiled['patterns']:
+        value = snapshot.resolve(pattern)
+        if value == None:
+            return True
+        values.append(value)
+    try:
+        return bool(compiled['evaluate'](values))
+    except (TypeError, ValueError, ArithmeticError, LookupError, AttributeError):
+        return False
+
+def get_warnings_issued(warnings, snapshot):
+    return [ warning for warning in warnings if is_warning_issued(warning, snapshot) ]
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+import threading
+
+from .models import *
+
+statuses_lock = threading.RLock()
+statuses_by_name = {}
+statuses_by_id = {}
+
+def load_statuses():
+    global statuses_by_name, statuses_by_id
+    with statuses_lock:
+        if len(statuses_by_id) == 0:
+            init_statuses()
+            by_name = {}
+            by_id = {}
+            for status in Status.objects.order_by('id'):
+                by_name[status.name] = status
+                by_id[status.id] = status
+            statuses_by_name, statuses_by_id = by_name, by_id
+        return statuses_by_name, statuses_by_id
+
+def get_status_by_name(name):
+    return load_statuses()[0][name]
+
+def get_status_by_id(id):
+    return load_statuses()[1][id]
+
+def get_statuses():
+    return sorted(load_statuses()[1].values(), key=lambda status: (status.severity, status.id))
+
+def get_default_status():
+    by_id = load_statuses()[1]
+    return by_id[min(by_id)]
+
+@receiver(post_save, sender=Status)
+@receiver(post_delete, sender=Status)
+def invalidate_statuses(sender, instance, **kwargs):
+    global statuses_by_name, statuses_by_id
+    with statuses_lock:
+        statuses_by_name, statuses_by_id = {}, {}
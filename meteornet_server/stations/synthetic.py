@@ -0,0 +1,56 @@
+from django.utils import timezone
+
+from datetime import timedelta
+import uuid
+import math
+
+from .models import *
+from . import stations, series, latest_values
+
+def seed_station(components, keys, days, interval):
+    station = Station()
+    station.security_token = uuid.uuid4().hex
+    station.approved = True
+    station.save()
+
+    now = timezone.now()
+    batch_count = days * 86400 // interval
+    for i in range(components):
+        component = Component()
+        component.name = 'Component ' + str(i)
+        component.station = station
+        component.save()
+
+        batches = []
+        for j in range(batch_count):
+            batch = MeasurementBatch()
+            batch.datetime = now - timedelta(seconds=j * interval)
+            batch.component = component
+            batches.append(batch)
+        stations.save_batches(batches)
+
+        measurements = []
+        samples = []
+        for j, batch in enumerate(batches):
+            for k in range(keys):
+                measurement = Measurement()
+                measurement.key = 'Key ' + str(k)
+                measurement.value = '{:.2f}V'.format(math.sin(j / 100 + k))
+                measurement.num, measurement.unit = series.parse_value(measurement.value)
+                measurement.batch = batch
+                measurement.datetime = batch.datetime
+                measurements.append(measurement)
+                if j == 0:
+                    samples.append((component.id, measurement.key, batch.datetime, measurement.value, measurement.num, measurement.unit))
+            if len(measurements) >= 10000:
+                Measurement.objects.bulk_create(measurements)
+                measurements = []
+        Measurement.objects.bulk_create(measurements)
+        latest_values.update_latest_values(samples)
+
+        error = Error()
+        error.component = component
+        error.message = 'Synthetic error'
+        error.save()
+
+    return station
@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from collections import OrderedDict
+import threading
+import time
+
+from .models import *
+
+try:
+    import uwsgi
+except ImportError:
+    uwsgi = None
+
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_SECONDS = 30
+UNKNOWN_TOKEN_CACHE_SECONDS = 60
+UNKNOWN_TOKEN = b'-'
+
+entries = OrderedDict()
+entries_lock = threading.Lock()
+
+def get_uwsgi_cache():
+    cache_name = getattr(settings, 'STATION_TOKEN_UWSGI_CACHE', None)
+    if uwsgi == None or cache_name == None:
+        return None
+    return cache_name
+
+def encode_entry(entry):
+    if entry == None:
+        return UNKNOWN_TOKEN
+    return '{}:{}'.format(entry[0], int(entry[1])).encode('ascii')
+
+def decode_entry(value):
+    if value == UNKNOWN_TOKEN:
+        return None
+    station_id, approved = value.decode('ascii').split(':')
+    return int(station_id), approved == '1'
+
+def get_local(security_token):
+    with entries_lock:
+        cached = entries.get(security_token)
+        if cached == None:
+            return False, None
+        expires, entry = cached
+        if expires < time.monotonic():
+            del entries[security_token]
+            return False, None
+        entries.move_to_end(security_token)
+        return True, entry
+
+def get_cache_seconds(entry):
+    return UNKNOWN_TOKEN_CACHE_SECONDS if entry == None else TOKEN_CACHE_SECONDS
+
+def set_local(security_token, entry):
+    with entries_lock:
+        entries[security_token] = (time.monotonic() + get_cache_seconds(entry), entry)
+        entries.move_to_end(security_token)
+        while len(entries) > TOKEN_CACHE_SIZE:
+            entries.popitem(last=False)
+
+def get_cached(security_token):
+    cache_name = get_uwsgi_cache()
+    if cache_name == None:
+        return get_local(security_token)
+    value = uwsgi.cache_get(security_token, cache_name)
+    if value == None:
+        return False, None
+    return True, decode_entry(value)
+
+def set_cached(security_token, entry):
+    cache_name = get_uwsgi_cache()
+    if cache_name == None:
+        set_local(security_token, entry)
+        return
+    uwsgi.cache_update(security_token, encode_entry(entry), get_cache_seconds(entry), cache_name)
+
+def invalidate(security_token):
+    cache_name = get_uwsgi_cache()
+    if cache_name == None:
+        with entries_lock:
+            entries.pop(security_token, None)
+    else:
+        uwsgi.cache_del(security_token, cache_name)
+
+def clear():
+    with entries_lock:
+        entries.clear()
+    cache_name = get_uwsgi_cache()
+    if cache_name != None:
+        uwsgi.cache_clear(cache_name)
+
+def lookup(security_token):
+    if type(security_token) is not str or len(security_token) > Station._meta.get_field('security_token').max_length:
+        return None
+    found, entry = get_cached(security_token)
+    if found:
+        return entry
+    entry = Station.objects.filter(security_token=security_token).values_list('id', 'approved').first()
+    set_cached(security_token, entry)
+    return entry
+
+def get_station(security_token):
+    entry = lookup(security_token)
+    if entry == None:
+        return None
+    station = Station.objects.filter(id=entry[0]).first()
+    if station == None or station.security_token != security_token:
+        invalidate(security_token)
+        return None
+    if station.approved != entry[1]:
+        set_cached(security_token, (station.id, station.approved))
+    return station
+
+def update_token(security_token, entry):
+    found, cached_entry = get_cached(security_token)
+    if found and cached_entry != entry:
+        set_cached(security_token, entry)
+
+@receiver(post_save, sender=Station)
+def station_saved(sender, instance, **kwargs):
+    security_token, entry = instance.security_token, (instance.id, instance.approved)
+    transaction.on_commit(lambda: update_token(security_token, entry))
+
+@receiver(post_delete, sender=Station)
+def station_deleted(sender, instance, **kwargs):
+    security_token = instance.security_token
+    transaction.on_commit(lambda: update_token(security_token, None))
@@ -0,0 +1,178 @@
+import gzip
+import io
+import json
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+FORM_CONTENT_TYPES = [ 'application/x-www-form-urlencoded', 'multipart/form-data' ]
+JSON_CONTENT_TYPE = 'application/json'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+MSGPACK_CONTENT_TYPES = [ 'application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack' ]
+CBOR_CONTENT_TYPE = 'application/cbor'
+
+class UnsupportedFormat(ValueError):
+    pass
+
+def load_json(body):
+    if orjson != None:
+        return orjson.loads(body)
+    if type(body) is bytes:
+        body = body.decode('utf-8')
+    return json.loads(body)
+
+def load_ndjson(body):
+    return [ load_json(line) for line in body.splitlines() if line.strip() != b'' ]
+
+def load_msgpack(body):
+    return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+def load_cbor(body):
+    return cbor2.loads(body)
+
+def get_decoders():
+    decoders = { JSON_CONTENT_TYPE : load_json, NDJSON_CONTENT_TYPE : load_ndjson }
+    if msgpack != None:
+        for content_type in MSGPACK_CONTENT_TYPES:
+            decoders[content_type] = load_msgpack
+    if cbor2 != None:
+        decoders[CBOR_CONTENT_TYPE] = load_cbor
+    return decoders
+
+def gzip_decompress(body):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = decompressor.decompress(body, MAX_BODY_SIZE + 1)
+    if len(data) > MAX_BODY_SIZE:
+        raise ValueError('Decompressed body is too large')
+    if not decompressor.eof:
+        raise ValueError('Truncated gzip body')
+    return data
+
+def zstd_decompress(body):
+    with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+        data = reader.read(MAX_BODY_SIZE + 1)
+    if len(data) > MAX_BODY_SIZE:
+        raise ValueError('Decompressed body is too large')
+    return data
+
+def get_decompressors():
+    decompressors = { 'identity' : lambda body: body, 'gzip' : gzip_decompress, 'x-gzip' : gzip_decompress }
+    if zstandard != None:
+        decompressors['zstd'] = zstd_decompress
+    return decompressors
+
+DECODERS = get_decoders()
+DECOMPRESSORS = get_decompressors()
+
+def is_form(content_type):
+    return content_type in FORM_CONTENT_TYPES or content_type == ''
+
+def get_encodings(content_encoding):
+    encodings = [ encoding.strip().lower() for encoding in (content_encoding or '').split(',') if encoding.strip() != '' ]
+    for encoding in encodings:
+        if not encoding in DECOMPRESSORS:
+            raise UnsupportedFormat('Unsupported content encoding: ' + encoding)
+    return encodings
+
+def decode_body(body, content_type, content_encoding=None):
+    if not content_type in DECODERS:
+        raise UnsupportedFormat('Unsupported content type: ' + content_type)
+    encodings = get_encodings(content_encoding)
+    try:
+        for encoding in reversed(encodings):
+            body = DECOMPRESSORS[encoding](body)
+        return DECODERS[content_type](body)
+    except ValueError:
+        raise
+    except Exception as exception:
+        raise ValueError(str(exception))
+
+def encode_body(data, content_type, content_encoding=None):
+    if content_type == JSON_CONTENT_TYPE:
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    elif content_type in MSGPACK_CONTENT_TYPES:
+        body = msgpack.packb(data, use_bin_type=True)
+    elif content_type == CBOR_CONTENT_TYPE:
+        body = cbor2.dumps(data)
+    else:
+        raise UnsupportedFormat('Unsupported content type: ' + content_type)
+
+    if content_encoding in [ 'gzip', 'x-gzip' ]:
+        body = gzip.compress(body)
+    elif content_encoding == 'zstd':
+        body = zstandard.ZstdCompressor().compress(body)
+    elif content_encoding != None and content_encoding != 'identity':
+        raise UnsupportedFormat('Unsupported content encoding: ' + content_encoding)
+    return body
+
+def is_scalar(value):
+    return type(value) in [ str, int, float, bool ] or value == None
+
+def validate_reading(reading):
+    if type(reading) is not dict:
+        return 'reading is not an object'
+    for key, value in reading.items():
+        if key == 'components':
+            if type(value) is not list:
+                return 'components is not a list'
+            for component_data in value:
+                if type(component_data) is not dict:
+                    return 'component is not an object'
+                if 'name' in component_data and type(component_data['name']) is not str:
+                    return 'component name is not a string'
+                measurements_data = component_data.get('measurements', {})
+                if type(measurements_data) is not dict:
+                    return 'measurements is not an object'
+                for measurement_key, measurement_value in measurements_data.items():
+                    if type(measurement_key) is not str:
+                        return 'measurement key is not a string'
+                    if type(measurement_value) is not str:
+                        if not type(measurement_value) in [ int, float, bool ]:
+                            return 'measurement value is not a scalar'
+                        measurements_data[measurement_key] = str(measurement_value)
+        elif key == 'maintainers':
+            if type(value) is not list:
+                return 'maintainers is not a list'
+            for maintainer_data in value:
+                if type(maintainer_data) is not dict:
+                    return 'maintainer is not an object'
+                for field, field_value in maintainer_data.items():
+                    if type(field_value) is not str:
+                        if not type(field_value) in [ int, float ]:
+                            return 'maintainer field is not a string'
+                        maintainer_data[field] = str(field_value)
+        elif key == 'timestamp':
+            if type(value) is bool or not type(value) in [ int, float, str ]:
+                return 'invalid timestamp'
+            try:
+                int(value)
+            except (ValueError, OverflowError):
+                return 'invalid timestamp'
+        elif key in [ 'security_token', 'error', 'component' ]:
+            if type(value) is not str:
+                return key + ' is not a string'
+        elif not is_scalar(value) and not type(value) in [ list, dict ]:
+            return key + ' is not a scalar'
+    if 'error' in reading and not 'component' in reading:
+        return 'error without component'
+    return None
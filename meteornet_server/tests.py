@@ -0,0 +1,507 @@
+from django.test import TestCase, SimpleTestCase, TransactionTestCase
+from django.db.migrations.executor import MigrationExecutor
+from django.contrib.auth.models import User
+from django.db import connection
+from django.core.cache import cache
+from django.utils import timezone as django_timezone
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from unittest import skipUnless, mock
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+from .stations import stations, series, token_cache, latest_values, rollups, graphs, graph_queue, station_map, status_warnings
+from .stations.models import *
+
+def get_reading(security_token, timestamp, keys):
+    return {
+        'security_token' : security_token,
+        'timestamp' : timestamp,
+        'components' : [ { 'name' : 'Component', 'measurements' : { 'Key ' + str(i) : '{}.5V'.format(i) for i in range(keys) } } ],
+        'maintainers' : [ { 'name' : 'Maintainer', 'phone' : '', 'email' : 'maintainer@example.com' } ],
+    }
+
+def build_series_reference(points, median_timedelta):
+    data = { 'values' : [ { 'x' : [], 'y' : [] } ], 'constant' : True }
+    for x, value, num, unit in points:
+        if len(data['values'][-1]['x']) > 0:
+            previous_x = data['values'][-1]['x'][-1]
+            if (x - previous_x) > series.GAP_FACTOR * median_timedelta:
+                data['values'].append({ 'x' : [], 'y' : [] })
+
+        data['values'][-1]['x'].append(x)
+        if 'classes' in data:
+            if not (value in data['classes']):
+                data['class_ids'].append(data['class_ids'][-1] + 1)
+                data['classes'].append(value)
+            data['values'][-1]['y'].append(data['class_ids'][data['classes'].index(value)])
+        else:
+            if 'unit' in data:
+                previous_unit = data['unit']
+            else:
+                previous_unit = None
+            if (previous_unit != None and unit != previous_unit) or num == None:
+                data['class_ids'] = []
+                data['classes'] = []
+                for i in range(len(data['values'])):
+                    for j in range(len(data['values'][i]['y'])):
+                        y = str(data['values'][i]['y'][j]) + data['unit']
+                        if not (y in data['classes']):
+                            new_id = data['class_ids'][-1] + 1 if len(data['class_ids']) > 0 else 1
+                            data['class_ids'].append(new_id)
+                            data['classes'].append(y)
+                        data['values'][i]['y'][j] = data['class_ids'][data['classes'].index(y)]
+                if not (value in data['classes']):
+                    new_id = data['class_ids'][-1] + 1 if len(data['class_ids']) > 0 else 1
+                    data['class_ids'].append(new_id)
+                    data['classes'].append(value)
+                data['values'][-1]['y'].append(data['class_ids'][data['classes'].index(value)])
+                if 'unit' in data: del data['unit']
+            else:
+                data['values'][-1]['y'].append(round(num, 2))
+                data['unit'] = unit
+        if len(data['values'][-1]['y']) >= 2 and \
+        (data['values'][-1]['y'][-1] != data['values'][-1]['y'][-2]):
+            data['constant'] = False
+    return data
+
+def get_random_points(generator):
+    points = []
+    moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(generator.randint(0, 300)):
+        moment += timedelta(seconds=generator.choice([ 60, 60, 60, 61, 59, 600, 3600 ]))
+        choice = generator.random()
+        if choice < 0.03:
+            value = generator.choice([ 'ok', 'error', '' ])
+        elif choice < 0.05:
+            value = '{:.3f}mV'.format(generator.uniform(0, 1000))
+        else:
+            value = '{:.3f}V'.format(generator.uniform(0, 20))
+        num, unit = series.parse_value(value)
+        points.append((moment, value, num, unit))
+    return points
+
+class BuildSeriesTests(SimpleTestCase):
+
+    def test_matches_reference_builder(self):
+        generator = random.Random(0)
+        for i in range(500):
+            points = get_random_points(generator)
+            datetimes = [ point[0] for point in points ]
+            reference = build_series_reference(points, series.get_median_interval(datetimes) * timedelta(seconds=1))
+            data = series.build_series(points, series.get_median_interval(datetimes))
+
+            segments = []
+            x = []
+            y = []
+            for segment in reference['values']:
+                segments.append((len(x), len(x) + len(segment['x'])))
+                x += segment['x']
+                y += segment['y']
+            self.assertEqual(data['segments'], segments)
+            self.assertEqual(data['x'], x)
+            self.assertEqual(data['y'].tolist(), y)
+            self.assertEqual(data['constant'], reference['constant'])
+            self.assertEqual(data.get('unit'), reference.get('unit'))
+            self.assertEqual(data.get('classes'), reference.get('classes'))
+            self.assertEqual(data.get('class_ids'), reference.get('class_ids'))
+
+class NewDataTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.timestamp = int(time.time()) // 86400 * 86400 - 86400 + 3600
+        Station.objects.create(security_token='token', approved=True, last_updated=datetime.fromtimestamp(self.timestamp - 3600, timezone.utc))
+        self.assertTrue(stations.new_data(get_reading('token', self.timestamp, 200)))
+
+    @skipUnless(connection.vendor == 'postgresql', 'SQLite splits bulk inserts by its variable limit')
+    def test_query_count_does_not_depend_on_key_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(stations.new_data(get_reading('token', self.timestamp + 60, 40)))
+        with self.assertNumQueries(len(queries.captured_queries)):
+            self.assertTrue(stations.new_data(get_reading('token', self.timestamp + 120, 200)))
+        self.assertEqual(Measurement.objects.count(), 440)
+
+    def test_duplicate_reading_is_stored_once(self):
+        reading = get_reading('token', self.timestamp + 60, 3)
+        for i in range(2):
+            response = self.client.post('/station_data', json.dumps(reading), content_type='application/json')
+            self.assertEqual(response.content.decode(), 'success')
+        for i in range(2):
+            response = self.client.post('/station_data_batch', json.dumps({ 'security_token' : 'token', 'readings' : [ reading, reading ] }),
+                content_type='application/json')
+            self.assertEqual(response.json()['acks'], [ { 'index' : 0, 'ok' : True }, { 'index' : 1, 'ok' : True } ])
+
+        batch_datetime = datetime.fromtimestamp(self.timestamp + 60, timezone.utc)
+        self.assertEqual(MeasurementBatch.objects.filter(datetime=batch_datetime).count(), 1)
+        self.assertEqual(sorted(Measurement.objects.filter(batch__datetime=batch_datetime).values_list('key', 'value')),
+            [ ('Key 0', '0.5V'), ('Key 1', '1.5V'), ('Key 2', '2.5V') ])
+
+    def test_error_for_component_added_in_same_batch(self):
+        reading = get_reading('token', self.timestamp + 60, 1)
+        reading['components'].append({ 'name' : 'New component', 'measurements' : { 'Key' : '1V' } })
+        error = { 'timestamp' : self.timestamp + 30, 'component' : 'New component', 'error' : 'Sensor fault' }
+        self.assertEqual(stations.new_data_batch('token', [ error, reading ]), [ { 'index' : 0, 'ok' : True }, { 'index' : 1, 'ok' : True } ])
+        self.assertEqual(list(Error.objects.values_list('component__name', 'message')), [ ('New component', 'Sensor fault') ])
+        self.assertEqual(Component.objects.filter(name='New component').count(), 1)
+
+    def test_late_reading_does_not_overwrite_station(self):
+        reading = get_reading('token', self.timestamp + 60, 1)
+        reading['name'] = 'New name'
+        reading['maintainers'] = [ { 'name' : 'New maintainer', 'phone' : '', 'email' : 'new@example.com' } ]
+        self.assertTrue(stations.new_data(reading))
+
+        reading = get_reading('token', self.timestamp - 60, 1)
+        reading['name'] = 'Old name'
+        reading['components'] = [ { 'name' : 'Old component', 'measurements' : { 'Key' : '1V' } } ]
+        self.assertTrue(stations.new_data(reading))
+
+        station = Station.objects.get(security_token='token')
+        self.assertEqual(station.name, 'New name')
+        self.assertEqual(int(station.last_updated.timestamp()), self.timestamp + 60)
+        self.assertEqual(list(station.maintainers.values_list('name', flat=True)), [ 'New maintainer' ])
+        self.assertFalse(Component.objects.get(name='Component').old)
+        self.assertEqual(Measurement.objects.filter(batch__component__name='Old component').count(), 1)
+
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.timestamp = int(time.time()) - 3600
+        self.station = Station.objects.create(security_token='token', approved=True)
+        self.assertTrue(stations.new_data(get_reading('token', self.timestamp, 1)))
+
+    def assertNotIngested(self, security_token, result):
+        measurement_count = Measurement.objects.count()
+        self.assertEqual(stations.new_data(get_reading(security_token, self.timestamp + 60, 1)), result)
+        self.assertEqual(Measurement.objects.count(), measurement_count)
+
+    def test_regenerated_token_is_rejected(self):
+        self.station.security_token = 'new token'
+        self.station.save()
+        self.assertNotIngested('token', False)
+        self.assertTrue(stations.new_data(get_reading('new token', self.timestamp + 60, 1)))
+
+    def test_unapproved_station_is_rejected(self):
+        self.station.approved = False
+        self.station.save()
+        self.assertNotIngested('token', True)
+        self.assertEqual(token_cache.lookup('token'), (self.station.id, False))
+
+    def test_deleted_station_is_rejected(self):
+        self.station.delete()
+        self.assertNotIngested('token', False)
+        self.assertEqual(token_cache.lookup('token'), None)
+
+    def test_unknown_token_expires(self):
+        self.assertEqual(token_cache.lookup('other token'), None)
+        station = Station.objects.create(security_token='other token', approved=True)
+        self.assertEqual(token_cache.lookup('other token'), None)
+        with mock.patch.object(token_cache.time, 'monotonic', return_value=time.monotonic() + token_cache.UNKNOWN_TOKEN_CACHE_SECONDS + 1):
+            self.assertEqual(token_cache.lookup('other token'), (station.id, True))
+
+class SeriesTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.station = Station.objects.create(security_token='token', approved=True)
+        self.timestamp = int(time.time()) // 86400 * 86400 - 86400
+
+    def add_values(self, values, interval, key='Key'):
+        for i, value in enumerate(values):
+            reading = get_reading('token', self.timestamp + i * interval, 0)
+            reading['components'][0]['measurements'] = { key : value }
+            self.assertTrue(stations.new_data(reading))
+
+    def test_mixed_rollups_fall_back_to_raw(self):
+        self.add_values([ '500mV', '1V', 'ok', '600mV', '1V' ], 10)
+        self.assertEqual(list(MeasurementRollup.objects.values_list('mixed', flat=True)), [ True ] * len(rollups.ROLLUP_RESOLUTIONS))
+
+        start = datetime.fromtimestamp(self.timestamp, timezone.utc)
+        points, resolution = stations.get_series_points(self.station, 'Component', 'Key', start, start + timedelta(minutes=1), 60)
+        self.assertEqual(resolution, None)
+        self.assertEqual([ point[1] for point in points ], [ '500mV', '1V', 'ok', '600mV', '1V' ])
+
+    def test_rollup_and_raw_series_agree(self):
+        cases = [
+            [ '1V', '2V', '3V', '4V' ],
+            [ '500mV', '1V', '600mV', '1V' ],
+            [ '1V', 'ok', '2V', 'error' ],
+        ]
+        for i, values in enumerate(cases):
+            self.add_values(values, 60, 'Key ' + str(i))
+
+        start = datetime.fromtimestamp(self.timestamp, timezone.utc)
+        end = start + timedelta(minutes=len(cases[0]))
+        for i, values in enumerate(cases):
+            rollup_points, resolution = stations.get_series_points(self.station, 'Component', 'Key ' + str(i), start, end, 60)
+            raw_points, raw_resolution = stations.get_series_points(self.station, 'Component', 'Key ' + str(i), start, end, None)
+            self.assertEqual(resolution, 60 if i == 0 else None)
+            rollup_data = series.build_series(rollup_points, 60)
+            raw_data = series.build_series(raw_points, 60)
+            self.assertEqual(rollup_data['y'].tolist(), raw_data['y'].tolist())
+            self.assertEqual(rollup_data.get('unit'), raw_data.get('unit'))
+            self.assertEqual(rollup_data.get('classes'), raw_data.get('classes'))
+
+class StatusWarningTests(TestCase):
+
+    def test_compile_rejects_unsafe_expressions(self):
+        for expression in [
+            '${Component.Key}.__class__ == 1',
+            '${Component.Key}.real > 1',
+            '${Component.Key}() > 1',
+            'len(${Component.Key}) > 1',
+            '__import__ == ${Component.Key}',
+            '__builtins__ != ${Component.Key}',
+            '[ x for x in ${Component.Key} ] == []',
+            '(lambda: 1)() == ${Component.Key}',
+            '${Component.Key} + 1',
+            '${Component.Key} > 1\x00',
+            '1 > 0',
+        ]:
+            self.assertEqual(status_warnings.compile_warning(expression), None, expression)
+        self.assertNotEqual(status_warnings.compile_warning('${Component.Key} > 1 and ${Component.Key} < 5'), None)
+
+    def test_evaluates_against_snapshot(self):
+        moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        snapshot = status_warnings.Snapshot({
+            ('Power Supply', 'Battery Voltage') : (moment, 11.5),
+            ('Power Supply', 'Battery Voltage Backup') : (moment - timedelta(hours=1), 13.0),
+            ('Power Supply', 'State') : (moment, 'ok'),
+        })
+        for expression, issued in [
+            ('${Power Supply.Battery Voltage} < 12', True),
+            ('${power_supply.battery_voltage} >= 12', False),
+            ('${Power Supply.Battery *} < 12', True),
+            ('${Power Supply.State} == "ok" and ${Power Supply.Battery Voltage} > 11', True),
+            ('${Power Supply.State} < 12', False),
+            ('${Power Supply.Missing} > 0', True),
+            ('${Power Supply.Battery Voltage} / 0 > 1', False),
+        ]:
+            warning = StatusWarning.objects.create(expression=expression, message='')
+            self.assertEqual(status_warnings.is_warning_issued(warning, snapshot), issued, expression)
+
+class GraphTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.settings = override_settings(GRAPH_CACHE_DIR=self.cache_dir.name)
+        self.settings.enable()
+        self.station = Station.objects.create(security_token='token', approved=True)
+        timestamp = int(time.time()) - 3600
+        for i in range(3):
+            self.assertTrue(stations.new_data(self.get_reading(timestamp + i * 60, i)))
+        graph_queue.take_dirty_components()
+
+    def get_reading(self, timestamp, value):
+        reading = get_reading('token', timestamp, 0)
+        reading['components'][0]['measurements'] = { 'Voltage' : '{}V'.format(value), 'Current' : '{}A'.format(value * 2) }
+        return reading
+
+    def tearDown(self):
+        self.settings.disable()
+        self.cache_dir.cleanup()
+
+    def render(self):
+        for graph_job in stations.get_graph_jobs(stations.get_component_series(self.station)):
+            graphs.render_graph(*graph_job)
+
+    def get_graphs(self):
+        return [ graph for component in stations.get_component_data(self.station) for graph in component['graphs'] ]
+
+    def test_views_only_serve_finished_graphs(self):
+        self.assertEqual(self.get_graphs(), [])
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+        self.assertEqual(len(graph_queue.take_dirty_components()), 1)
+
+        self.render()
+        finished_graphs = self.get_graphs()
+        self.assertEqual(len(finished_graphs), 2)
+        self.assertTrue(all([ graphs.graph_exists(graph) for graph in finished_graphs ]))
+        self.assertEqual(len(graph_queue.take_dirty_components()), 0)
+
+        self.assertTrue(stations.new_data(self.get_reading(int(time.time()) - 60, 5)))
+        graph_queue.take_dirty_components()
+        self.assertEqual(self.get_graphs(), finished_graphs)
+        self.assertEqual(len(graph_queue.take_dirty_components()), 1)
+
+class PersonMigrationTests(TransactionTestCase):
+    migrate_from = [ ('meteornet_server', '0005_auto_20191223_0221') ]
+    migrate_to = [ ('meteornet_server', '0006_auto_20261018_1601') ]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_persons_are_merged(self):
+        apps = self.migrate(self.migrate_from)
+        Person = apps.get_model('meteornet_server', 'Person')
+        Station = apps.get_model('meteornet_server', 'Station')
+        station = Station.objects.create(security_token='token')
+        station.maintainers.add(
+            Person.objects.create(name='Maintainer', phone='123', email='maintainer@example.com'),
+            Person.objects.create(name=' Maintainer ', phone='1 2 3', email='Maintainer@Example.com '),
+        )
+        Station.objects.create(security_token='other token').maintainers.add(
+            Person.objects.create(name='Maintainer', phone='123', email='MAINTAINER@example.com')
+        )
+
+        apps = self.migrate(self.migrate_to)
+        Person = apps.get_model('meteornet_server', 'Person')
+        Station = apps.get_model('meteornet_server', 'Station')
+        self.assertEqual(list(Person.objects.values_list('name', 'phone', 'email')), [ ('Maintainer', '123', 'maintainer@example.com') ])
+        for station in Station.objects.all():
+            self.assertEqual(station.maintainers.count(), 1)
+
+class StationMapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Station.objects.create(security_token='token 0', name='Station 0', approved=True, latitude=46.0, longitude=14.5)
+        Station.objects.create(security_token='token 1', name='Station 1', approved=True, latitude=-33.9, longitude=151.2)
+
+    def get_features(self, query):
+        response = self.client.get('/station_map', query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['features']
+
+    def test_public_map_does_not_expose_stations(self):
+        features = self.get_features({ 'zoom' : station_map.MAP_MAX_ZOOM })
+        self.assertEqual(len(features), 2)
+        for feature in features:
+            self.assertEqual(feature['properties'], { 'count' : 1 })
+
+    def test_bbox_limits_features(self):
+        self.assertEqual(self.get_features({ 'zoom' : 10, 'bbox' : '10,40,20,50' })[0]['geometry']['coordinates'], [ 14.5, 46.0 ])
+        self.assertEqual(self.get_features({ 'zoom' : 10, 'bbox' : '140,-40,200,-30' })[0]['geometry']['coordinates'], [ 151.2, -33.9 ])
+        self.assertEqual(len(self.get_features({ 'zoom' : 10, 'bbox' : '-10,-10,10,10' })), 0)
+        self.assertEqual(len(self.get_features({ 'zoom' : 10, 'bbox' : '-540,-90,540,90' })), 2)
+        self.assertEqual(len(self.get_features({ 'zoom' : 10, 'bbox' : 'invalid' })), 2)
+
+class OverviewTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('user', password='password'))
+        self.station_count = 0
+
+    def add_stations(self, count):
+        Station.objects.bulk_create([
+            Station(security_token='token ' + str(i), name='Station ' + str(i), approved=True)
+            for i in range(self.station_count, self.station_count + count)
+        ])
+        self.station_count += count
+
+    def get_overview_query_counts(self):
+        query_counts = []
+        for query in [ { 'sort' : 'severity' }, { 'sort' : 'last_updated' }, { 'sort' : 'last_updated', 'search' : 'Station' } ]:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get('/stations_overview', query).status_code, 200)
+            query_counts.append(len(queries.captured_queries))
+        return query_counts
+
+    def test_query_count_does_not_depend_on_fleet_size(self):
+        self.add_stations(10)
+        self.get_overview_query_counts()
+        query_counts = self.get_overview_query_counts()
+        for count in [ 90, 900 ]:
+            self.add_stations(count)
+            self.assertEqual(self.get_overview_query_counts(), query_counts)
+
+def insert_select(model, fields, select, params):
+    with connection.cursor() as cursor:
+        cursor.execute('INSERT INTO {} ({}) {}'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join([ connection.ops.quote_name(model._meta.get_field(name).column) for name in fields ]),
+            select.format(
+                station=connection.ops.quote_name(Station._meta.db_table),
+                component=connection.ops.quote_name(Component._meta.db_table),
+                batch=connection.ops.quote_name(MeasurementBatch._meta.db_table)
+            )
+        ), params)
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL')
+class QueryPlanTests(TestCase):
+    STATIONS = 500
+    COMPONENTS = 2
+    BATCHES = 48
+    KEYS = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        init_statuses()
+        cls.now = django_timezone.now()
+        Station.objects.bulk_create([
+            Station(security_token='token ' + str(i), name='Station ' + str(i), approved=i % 10 != 0,
+            last_updated=cls.now - timedelta(minutes=i)) for i in range(cls.STATIONS)
+        ])
+        Component.objects.bulk_create([
+            Component(station=station, name='Component ' + str(i)) for station in Station.objects.all() for i in range(cls.COMPONENTS)
+        ])
+        insert_select(MeasurementBatch, [ 'datetime', 'component' ],
+            "SELECT %s - i * interval '1 hour', c.id FROM {component} c CROSS JOIN generate_series(0, %s) i", [ cls.now, cls.BATCHES - 1 ])
+        insert_select(Measurement, [ 'key', 'value', 'num', 'unit', 'batch', 'datetime' ],
+            "SELECT 'Key ' || i, '1.5V', 1.5, 'V', b.id, b.datetime FROM {batch} b CROSS JOIN generate_series(0, %s) i", [ cls.KEYS - 1 ])
+        insert_select(MeasurementRollup, [ 'component', 'key', 'resolution', 'start', 'count', 'minimum', 'maximum', 'total', 'last', 'last_datetime', 'unit', 'mixed' ],
+            "SELECT b.component_id, 'Key ' || i, 3600, b.datetime, 1, 1.5, 1.5, 1.5, 1.5, b.datetime, 'V', FALSE FROM {batch} b CROSS JOIN generate_series(0, %s) i",
+            [ cls.KEYS - 1 ])
+        insert_select(LatestValue, [ 'component', 'key', 'value', 'num', 'unit', 'datetime' ],
+            "SELECT c.id, 'Key ' || i, '1.5V', 1.5, 'V', %s FROM {component} c CROSS JOIN generate_series(0, %s) i", [ cls.now, cls.KEYS - 1 ])
+        insert_select(Error, [ 'message', 'component', 'datetime' ], "SELECT 'Error', c.id, %s FROM {component} c", [ cls.now ])
+        insert_select(DirtyStation, [ 'station', 'marked' ], 'SELECT s.id, %s FROM {station} s', [ cls.now ])
+        insert_select(DirtyComponent, [ 'component', 'marked', 'uploads' ], 'SELECT c.id, %s, 1 FROM {component} c', [ cls.now ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.station = Station.objects.get(security_token='token ' + str(cls.STATIONS // 2))
+        cls.recent = cls.now - timedelta(days=stations.RECENT_MEASUREMENTS_DAYS)
+
+    def assertNoSeqScan(self, queryset):
+        plan = queryset.explain()
+        self.assertEqual(re.findall('Seq Scan on (\\w+)', plan), [], plan)
+
+    def test_ingest_queries(self):
+        self.assertNoSeqScan(Station.objects.filter(security_token=self.station.security_token))
+        self.assertNoSeqScan(Component.objects.filter(station=self.station.id))
+
+    def test_station_view_queries(self):
+        component_ids = list(Component.objects.filter(station=self.station.id).values_list('id', flat=True))
+        self.assertNoSeqScan(stations.get_component_measurements(component_ids, self.recent))
+        self.assertNoSeqScan(stations.get_series_measurements(self.station, 'Component 0', 'Key 0', self.recent, self.now))
+        self.assertNoSeqScan(Error.objects.filter(component__station=self.station.id).select_related('component').order_by('component', 'id'))
+        self.assertNoSeqScan(latest_values.get_latest_values(self.station, self.recent))
+
+    def test_rollup_queries(self):
+        self.assertNoSeqScan(MeasurementRollup.objects.filter(
+            component__station=self.station.id, component__name='Component 0', key='Key 0',
+            resolution=3600, start__gte=self.recent, start__lte=self.now
+        ).order_by('start'))
+
+    def test_retention_queries(self):
+        self.assertNoSeqScan(MeasurementBatch.objects.filter(
+            datetime__lt=self.now - timedelta(days=stations.OLD_DATA_DAYS)
+        ).order_by('datetime', 'id').values_list('id', flat=True)[:500])
+
+    def test_queue_queries(self):
+        self.assertNoSeqScan(DirtyStation.objects.select_for_update(skip_locked=True, of=('self',)).order_by('marked').values_list(
+            'id', 'station', 'marked'
+        )[:500])
+        self.assertNoSeqScan(DirtyStation.objects.order_by('marked').values_list('marked', flat=True)[:1])
+        self.assertNoSeqScan(DirtyComponent.objects.select_for_update(skip_locked=True).order_by('marked').values_list(
+            'id', 'component', 'uploads'
+        )[:500])
+
+    def test_overview_queries(self):
+        self.assertNoSeqScan(stations.get_current_list().select_related('status').only(*stations.OVERVIEW_FIELDS).order_by(
+            *stations.OVERVIEW_SORTS['last_updated']
+        )[:stations.OVERVIEW_PAGE_SIZE + 1])
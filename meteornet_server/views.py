@@ -1,22 +1,22 @@
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, HttpResponseBadRequest, FileResponse, JsonResponse
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from django.shortcuts import render, redirect
 from django.utils import timezone
+from django.utils.timezone import make_aware
 from django.contrib.auth import authenticate, login as django_login, logout as django_logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from wsgiref.util import FileWrapper
 
+from datetime import datetime, timedelta
 from os import path
-import PIL
 import json
-import math
+from urllib.parse import urlencode
 
 from .models import *
-from .stations import stations
+from .stations import stations, graphs, wire, code_distribution, station_map
 
 RESPONSE_SUCCESS = "success"
 RESPONSE_FAILURE = "failure"
@@ -66,62 +66,51 @@ def format_last_updated(last_updated):
 
 @require_http_methods(["GET"])
 def index(request):
-    station_coordinates = []
-    center = { 'longitude' : 0, 'latitude' : 0 }
-    zoom_level = 1
-
-    station_list = stations.get_current_list()
-    if len(station_list) > 0:
-        count = 0
-        for station in station_list:
-            station_coordinates.append({ 'longitude' : station.longitude, 'latitude' : station.latitude })
-            center['longitude'] += station.longitude
-            center['latitude'] += station.latitude
-            count += 1
-        center['longitude'] /= count
-        center['latitude'] /= count
-
-        max_distance = 0
-        for station in station_list:
-            distance = math.sqrt(
-                (center['longitude'] - station.longitude) ** 2 +
-                (center['latitude'] - station.latitude) ** 2
-            )
-            if distance > max_distance:
-                max_distance = distance
-
-        if max_distance > 0:
-            zoom_level = -math.log(256 * max_distance / 40000000 * 100)
-            if zoom_level > 7: zoom_level = 7
-        else:
-            zoom_level = 7
-
     context = {
-        'station_coordinates' : station_coordinates,
-        'center' : center,
-        'zoom_level' : zoom_level,
         'settings' : settings
     }
     return render(request, 'index.html', context)
 
+def get_map_zoom(request):
+    try:
+        return int(request.GET.get('zoom', station_map.MAP_DEFAULT_ZOOM))
+    except ValueError:
+        return station_map.MAP_DEFAULT_ZOOM
+
+def get_map_bbox(request):
+    try:
+        bounds = [ float(bound) for bound in request.GET['bbox'].split(',') ]
+    except (KeyError, ValueError):
+        return None
+    if len(bounds) != 4:
+        return None
+    return station_map.get_bbox(*bounds)
+
+@require_http_methods(["GET"])
+@condition(etag_func=lambda request: station_map.get_etag(get_map_zoom(request), get_map_bbox(request)))
+def station_map_data(request):
+    response = HttpResponse(station_map.get_map_payload(get_map_zoom(request), get_map_bbox(request)), content_type='application/geo+json')
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
 @require_http_methods(["GET"])
 @login_required
 def stations_overview(request):
-    station_list = stations.get_current_list()
+    sort = request.GET.get('sort', 'severity')
+    if not sort in stations.OVERVIEW_SORTS: sort = 'severity'
+    search = request.GET.get('search', '').strip()
+    status_name = request.GET.get('status', '')
+    cursor = request.GET.get('after', None)
+    station_list, next_cursor = stations.get_overview_page(sort, cursor, search, status_name)
 
     station_rows = []
     for i in range(0, len(station_list), STATIONS_PER_ROW):
         row = {}
 
         station_cards = []
-        for j in range(STATIONS_PER_ROW):
-            if i + j >= len(station_list): break
-
-            station = station_list[i + j]
-
+        for station in station_list[i:i + STATIONS_PER_ROW]:
             station_card = {}
             station_card['id'] = station.id
-            station_card['security_token'] = station.security_token
             station_card['name'] = station.name
             station_card['latitude'] = station.latitude
             station_card['longitude'] = station.longitude
@@ -139,7 +128,17 @@ def stations_overview(request):
 
         station_rows.append(row)
 
-    context = { 'station_rows' : station_rows, 'settings' : settings }
+    filters = { 'sort' : sort, 'search' : search, 'status' : status_name }
+    context = {
+        'station_rows' : station_rows,
+        'filters' : filters,
+        'statuses' : stations.get_statuses(),
+        'sorts' : [ ('severity', 'Status'), ('last_updated', 'Last update') ],
+        'first_page_query' : urlencode(filters),
+        'next_page_query' : urlencode(dict(filters, after=next_cursor)) if next_cursor != None else None,
+        'is_first_page' : cursor == None,
+        'settings' : settings
+    }
     return render(request, 'stations_overview.html', context)
 
 @require_http_methods(["GET"])
@@ -184,6 +183,7 @@ def administration(request):
         'registration_requests_rows' : registration_requests_rows,
         'notes' : notes.content,
         'warnings' : warnings,
+        'status_queue' : stations.get_status_queue_stats(),
         'settings' : settings }
     return render(request, 'administration.html', context)
 
@@ -195,11 +195,7 @@ def administration_notes_update(request):
     notes.save()
     return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-@require_http_methods(["GET"])
-@login_required
-def station_view(request, station_id):
-    station = stations.get_by_id(station_id)
-    errors = stations.get_errors(station)
+def get_maintainer_rows(station):
     maintainers = stations.get_maintainers(station)
 
     maintainer_rows = []
@@ -224,7 +220,9 @@ def station_view(request, station_id):
         row['sidecol_size'] = (12 - len(maintainer_cards) * row['col_size']) // 2
 
         maintainer_rows.append(row)
+    return maintainer_rows
 
+def get_component_rows(station):
     component_data = stations.get_component_data(station)
 
     for component in component_data:
@@ -253,26 +251,64 @@ def station_view(request, station_id):
             row['sidecol_size'] = (12 - len(row_graphs) * row['col_size']) // 2
 
             component['graphs_rows'].append(row)
+    return component_data
 
-    warnings_issued = stations.get_warnings_issued(station)
+@require_http_methods(["GET"])
+@login_required
+def station_view(request, station_id):
+    station = stations.get_by_id(station_id)
 
     context = {
         'station' : station,
         'last_updated' : format_last_updated(station.last_updated),
-        'maintainer_rows' : maintainer_rows,
-        'component_data' : component_data,
-        'errors' : errors,
-        'warnings_issued' : warnings_issued,
+        'maintainer_rows' : lambda: get_maintainer_rows(station),
+        'component_data' : lambda: get_component_rows(station),
+        'errors' : lambda: stations.get_errors(station),
+        'warnings_issued' : lambda: stations.get_warnings_issued(station),
+        'fragment_cache' : stations.get_fragment_cache(),
+        'fragment_seconds' : stations.FRAGMENT_CACHE_SECONDS,
         'settings' : settings
     }
     return render(request, 'station_view.html', context)
 
+@require_http_methods(["GET"])
+@login_required
+def station_series(request, station_id):
+    station = stations.get_by_id(station_id)
+    component = request.GET.get('component', None)
+    key = request.GET.get('key', None)
+    if component == None or key == None: return HttpResponseBadRequest()
+    try:
+        if 'end' in request.GET:
+            end = make_aware(datetime.fromtimestamp(int(request.GET['end'])))
+        else:
+            end = timezone.now()
+        if 'start' in request.GET:
+            start = make_aware(datetime.fromtimestamp(int(request.GET['start'])))
+        else:
+            start = end - timedelta(days=stations.RECENT_MEASUREMENTS_DAYS)
+        points = int(request.GET.get('points', stations.SERIES_DEFAULT_POINTS))
+    except (ValueError, OverflowError, OSError):
+        return HttpResponseBadRequest()
+    return JsonResponse(stations.get_series(station, component, key, start, end, points))
+
+def get_payload(request):
+    if wire.is_form(request.content_type):
+        data = request.POST.get('json', None)
+        if data == None: return None
+        return json.loads(data)
+    return wire.decode_body(request.body, request.content_type, request.META.get('HTTP_CONTENT_ENCODING'))
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def station_register(request):
-    data = request.POST.get('json', None)
-    if data == None: return HttpResponse(RESPONSE_FAILURE)
-    data = json.loads(data)
+    try:
+        data = get_payload(request)
+    except wire.UnsupportedFormat:
+        return HttpResponse(RESPONSE_FAILURE, status=415)
+    except ValueError:
+        return HttpResponse(RESPONSE_FAILURE)
+    if type(data) is not dict: return HttpResponse(RESPONSE_FAILURE)
     return HttpResponse(stations.register(data))
 
 @require_http_methods(["POST"])
@@ -284,29 +320,108 @@ def station_registration_resolve(request):
 @require_http_methods(["POST"])
 @csrf_exempt
 def station_data(request):
-    data = request.POST.get('json', None)
+    try:
+        data = get_payload(request)
+    except wire.UnsupportedFormat:
+        return HttpResponse(RESPONSE_FAILURE, status=415)
+    except ValueError:
+        return HttpResponse(RESPONSE_FAILURE)
     if data == None: return HttpResponse(RESPONSE_FAILURE)
-    data = json.loads(data)
     if stations.new_data(data):
         return HttpResponse(RESPONSE_SUCCESS)
     else:
         return HttpResponse(RESPONSE_FAILURE)
 
+def get_batch_readings(request):
+    readings = get_payload(request)
+    security_token = request.GET.get('security_token', None)
+    if type(readings) is dict:
+        security_token = readings.get('security_token', security_token)
+        readings = readings.get('readings', None)
+    if type(readings) is not list:
+        return None, None
+    if security_token == None and len(readings) > 0 and type(readings[0]) is dict:
+        security_token = readings[0].get('security_token', None)
+    return security_token, readings
+
 @require_http_methods(["POST"])
 @csrf_exempt
+def station_data_batch(request):
+    try:
+        security_token, readings = get_batch_readings(request)
+    except wire.UnsupportedFormat:
+        return HttpResponse(RESPONSE_FAILURE, status=415)
+    except ValueError:
+        return HttpResponse(RESPONSE_FAILURE)
+    if readings == None: return HttpResponse(RESPONSE_FAILURE)
+    acks = stations.new_data_batch(security_token, readings)
+    if acks == None: return HttpResponse(RESPONSE_FAILURE)
+    return JsonResponse({ 'accepted' : len([ ack for ack in acks if ack['ok'] ]), 'acks' : acks })
+
+def get_code_etag(request, *args):
+    return code_distribution.get_etag()
+
+def get_delta_etag(request):
+    name = code_distribution.get_delta(request.GET.get('from', None))
+    if name == None:
+        return None
+    return name[:-len('.zip')]
+
+def code_file_response(request, name, etag):
+    filepath = code_distribution.get_cache_path(name)
+    if not settings.DEBUG:
+        response = HttpResponse(content_type='application/zip')
+        response['X-Accel-Redirect'] = code_distribution.CODE_ACCEL_REDIRECT_PREFIX + name
+        return response
+
+    size = path.getsize(filepath)
+    byte_range = None
+    if request.META.get('HTTP_IF_RANGE', '"' + etag + '"').strip('"') == etag:
+        byte_range = code_distribution.parse_range(request.META.get('HTTP_RANGE', None), size)
+    if byte_range == False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+    if byte_range == None:
+        response = FileResponse(open(filepath, 'rb'), content_type='application/zip')
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        with open(filepath, 'rb') as f:
+            f.seek(start)
+            response = HttpResponse(f.read(end - start + 1), status=206, content_type='application/zip')
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+@require_http_methods(["GET", "POST"])
+@csrf_exempt
+@condition(etag_func=get_code_etag)
 def station_version(request):
     return HttpResponse(stations.get_version())
 
 @require_http_methods(["GET", "POST"])
 @csrf_exempt
+@condition(etag_func=get_code_etag)
 def station_code_download(request):
-    filepath = stations.get_code_filepath()
-    with open(filepath, 'rb') as zipfile:
-        wrapper = FileWrapper(zipfile)
-        response = HttpResponse(wrapper, content_type='application/zip')
-        response['Content-Disposition'] = 'attachment; filename=station_code.zip'
-        response['Content-Length'] = path.getsize(filepath)
-        return response
+    etag = code_distribution.get_etag()
+    response = code_file_response(request, code_distribution.get_archive_name(etag), etag)
+    response['Content-Disposition'] = 'attachment; filename=station_code.zip'
+    return response
+
+@require_http_methods(["GET"])
+@condition(etag_func=get_code_etag)
+def station_code_manifest(request):
+    return JsonResponse(code_distribution.get_manifest())
+
+@require_http_methods(["GET"])
+@condition(etag_func=get_delta_etag)
+def station_code_delta(request):
+    name = code_distribution.get_delta(request.GET.get('from', None))
+    if name == None: raise Http404
+    response = code_file_response(request, name, name[:-len('.zip')])
+    response['Content-Disposition'] = 'attachment; filename=station_code_delta.zip'
+    return response
 
 @require_http_methods(["POST"])
 @login_required
@@ -324,10 +439,17 @@ def station_delete(request):
 
 @require_http_methods(["GET"])
 @login_required
+@condition(etag_func=lambda request, graph: graphs.get_graph_etag(graph),
+           last_modified_func=lambda request, graph: graphs.get_graph_last_modified(graph))
 def station_graph(request, graph):
-    response = HttpResponse(content_type='image/png')
-    graph = PIL.Image.open(stations.get_graph_path(graph))
-    graph.save(response, 'PNG')
+    if not graphs.graph_exists(graph): raise Http404
+    graphs.touch_graph(graph)
+    if settings.DEBUG:
+        response = FileResponse(open(graphs.get_graph_path(graph), 'rb'), content_type='image/png')
+    else:
+        response = HttpResponse(content_type='image/png')
+        response['X-Accel-Redirect'] = graphs.GRAPH_ACCEL_REDIRECT_PREFIX + graph
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
     return response
 
 @require_http_methods(["POST"])